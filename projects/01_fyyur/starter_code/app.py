@@ -1,16 +1,48 @@
+import hashlib
 import json
-import logging
 import os
-from datetime import datetime
-
-import babel
-import dateutil.parser
-from flask import Flask, Response, flash, redirect, render_template, request, url_for
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from functools import wraps
+from itertools import groupby
+
+import click
+from flask import (
+    Flask,
+    Response,
+    abort,
+    flash,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
+from flask.cli import AppGroup
 from flask_migrate import Migrate
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 from flask_wtf import Form
-
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.engine import Engine
+from werkzeug.http import is_resource_modified
+
+import assets
+import autocomplete
+import cache
+import export
+import facets
+import formatting
+import importer
+import instrumentation
+import logs
+import pagination
+import routing
+import search
 from forms import *
 
 app = Flask(__name__)
@@ -18,83 +50,446 @@ app.config.from_object("config")
 
 moment = Moment(app)
 
-db = SQLAlchemy(app)
+db = routing.RoutingSQLAlchemy(app)
 db.init_app(app)
 migrate = Migrate(app, db, compare_type=True)
+page_cache = cache.create_cache(app.config)
+sql_instrumentation = instrumentation.SQLInstrumentation(app)
+static_assets = assets.StaticAssets(app)
+
+
+# a JSON array on SQLite, which has no ARRAY type
+GENRES = db.ARRAY(db.String(120)).with_variant(db.JSON(), "sqlite")
 
 
 class Venue(db.Model):
     __tablename__ = "Venue"
+    __table_args__ = (
+        db.Index("ix_venue_area", "state", "city", "name", "id"),
+        db.Index("ix_venue_genres", "genres", postgresql_using="gin"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.ARRAY(db.String(120)))
+    genres = db.Column(GENRES)
     phone = db.Column(db.String(120), nullable=False)
     website = db.Column(db.String(500))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean())
     seeking_description = db.Column(db.String(500))
+    search_document = db.Column(db.Text)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
-    children = db.relationship("Show", backref="show_venue", cascade="all,delete")
+    # the database deletes a venue's shows through ON DELETE CASCADE
+    children = db.relationship(
+        "Show", backref="show_venue", cascade="all,delete", passive_deletes=True
+    )
 
 
 class Artist(db.Model):
     __tablename__ = "Artist"
+    __table_args__ = (
+        db.Index("ix_artist_name_id", "name", "id"),
+        db.Index("ix_artist_genres", "genres", postgresql_using="gin"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.ARRAY(db.String(120)))
+    genres = db.Column(GENRES)
     website = db.Column(db.String(500))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean())
     seeking_description = db.Column(db.String(500))
+    search_document = db.Column(db.Text)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
 
-    children = db.relationship("Show", backref="show_artist", cascade="all,delete")
+    children = db.relationship(
+        "Show", backref="show_artist", cascade="all,delete", passive_deletes=True
+    )
 
 
 class Show(db.Model):
     __tablename__ = "Shows"
+    # on Postgres the migrations also add exclusion constraints that reject
+    # overlapping shows at the same venue or by the same artist
+    __table_args__ = (
+        db.CheckConstraint("end_time >= start_time", name="ck_shows_end_time"),
+        db.Index("ix_shows_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_shows_start_time_id", "start_time", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    start_time = db.Column(db.String(), nullable=False)
+    start_time = db.Column(db.DateTime(), nullable=False)
+    end_time = db.Column(db.DateTime(), nullable=False)
+
+    venue_id = db.Column(
+        db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), nullable=False
+    )
+    artist_id = db.Column(
+        db.Integer, db.ForeignKey("Artist.id", ondelete="CASCADE"), nullable=False
+    )
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+def update_search_document(mapper, connection, target):
+    target.search_document = search.build_document(
+        target.name, target.city, target.state, target.genres
+    )
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite only enforces foreign keys, and so ON DELETE CASCADE, when asked to
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+class FacetCount(db.Model):
+    __tablename__ = "FacetCounts"
+
+    entity = db.Column(db.String(20), primary_key=True)
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(120), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def previous_value(target, attr):
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+
+def count_facets(connection, target, old=(None, None), new=(None, None)):
+    facets.apply_changes(
+        connection,
+        FacetCount.__table__,
+        target.__tablename__.lower(),
+        facets.count_changes(old, new),
+    )
+
+
+def count_inserted_facets(mapper, connection, target):
+    count_facets(connection, target, new=(target.genres, target.state))
+
 
-    venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"), nullable=False)
+def count_updated_facets(mapper, connection, target):
+    old = (previous_value(target, "genres"), previous_value(target, "state"))
+    count_facets(connection, target, old=old, new=(target.genres, target.state))
 
 
-def get_show_info(show):
-    # helper method for show_context
-    artist = Artist.query.get(show.artist_id)
-    venue = Venue.query.get(show.venue_id)
+def count_deleted_facets(mapper, connection, target):
+    count_facets(connection, target, old=(target.genres, target.state))
+
+
+for model in (Venue, Artist):
+    event.listen(model, "before_insert", update_search_document)
+    event.listen(model, "before_update", update_search_document)
+    event.listen(model, "after_insert", count_inserted_facets)
+    event.listen(model, "after_update", count_updated_facets)
+    event.listen(model, "after_delete", count_deleted_facets)
+
+
+def name_loader(model):
+    # reads on the engine rather than the session, so that the background
+    # reloads of the autocomplete index work outside any request
+    table = model.__table__
+    return lambda: db.engine.execute(db.select([table.c.id, table.c.name]))
+
+
+name_indexes = {
+    model: autocomplete.PrefixIndex(
+        name_loader(model), app.config["AUTOCOMPLETE_REFRESH"]
+    )
+    for model in (Venue, Artist)
+}
+
+
+def search_results(model):
+    # renders the ranked search page shared by venues and artists
+    search_term = request.form.get("search_term", "")
+    page = max(request.form.get("page", 1, type=int), 1)
+    per_page = app.config["SEARCH_PAGE_SIZE"]
+    rows, count = search.search(db.session, model, search_term, page, per_page)
+    return {
+        "count": count,
+        "data": [{"id": row.id, "name": row.name} for row in rows],
+        "page": page,
+        "has_next": page * per_page < count,
+    }
+
+
+def query_shows_info(*criterion):
+    # joins shows with their artist and venue columns, ordered by start time
+    return (
+        db.session.query(
+            Show.start_time,
+            Artist.id.label("artist_id"),
+            Artist.name.label("artist_name"),
+            Artist.image_link.label("artist_image_link"),
+            Venue.id.label("venue_id"),
+            Venue.name.label("venue_name"),
+            Venue.image_link.label("venue_image_link"),
+        )
+        .join(Artist, Show.artist_id == Artist.id)
+        .join(Venue, Show.venue_id == Venue.id)
+        .filter(*criterion)
+        .order_by(Show.start_time, Show.id)
+    )
+
+
+def format_show_info(row):
     return {
-        "artist_name": artist.name,
-        "artist_id": artist.id,
-        "artist_image_link": artist.image_link,
-        "venue_name": venue.name,
-        "venue_id": venue.id,
-        "venue_image_link": venue.image_link,
-        "start_time": str(show.start_time),
+        "artist_name": row.artist_name,
+        "artist_id": row.artist_id,
+        "artist_image_link": row.artist_image_link,
+        "venue_name": row.venue_name,
+        "venue_id": row.venue_id,
+        "venue_image_link": row.venue_image_link,
+        "start_time": str(row.start_time),
     }
 
 
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+def get_upcoming_and_past_shows(*criterion):
+    # splits a single ordered query into upcoming and past shows
+    now = datetime.now()
+    upcoming_shows, past_shows = [], []
+    for row in query_shows_info(*criterion):
+        shows = upcoming_shows if row.start_time > now else past_shows
+        shows.append(format_show_info(row))
+    return upcoming_shows, past_shows
+
 
+def overlapping_shows(start_time, end_time):
+    # shows last at most MAX_SHOW_DURATION, so only those starting that long
+    # before start_time can overlap: a short range on the start_time indexes
+    return db.and_(
+        Show.start_time > start_time - MAX_SHOW_DURATION,
+        Show.start_time < end_time,
+        Show.end_time > start_time,
+    )
 
-app.jinja_env.filters["datetime"] = format_datetime
+
+def check_booking(artist_id, venue_id, start_time, end_time):
+    # (artist exists, venue exists, artist busy, venue busy) in one query
+    overlapping = overlapping_shows(start_time, end_time)
+    return db.session.query(
+        db.exists().where(Artist.id == artist_id),
+        db.exists().where(Venue.id == venue_id),
+        db.exists().where(db.and_(Show.artist_id == artist_id, overlapping)),
+        db.exists().where(db.and_(Show.venue_id == venue_id, overlapping)),
+    ).one()
+
+
+def page_key(kind, entity_id):
+    return f"{kind}:{entity_id}"
+
+
+def cached_page(kind, id_arg):
+    # serves a detail page from the page cache, rendering it on a miss
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            # pending flashed messages are rendered into the page, so skip the cache
+            if page_cache is None or session.get("_flashes"):
+                return view(**kwargs)
+            key = page_key(kind, kwargs[id_arg])
+            page = page_cache.get(key)
+            if page is None:
+                page = view(**kwargs)
+                # a lagging replica could put back a page that was just invalidated
+                if not routing.used_replica():
+                    page_cache.set(key, page)
+            return page
+
+        return wrapper
+
+    return decorator
+
+
+def page_version(model, entity_id):
+    # everything a venue or artist page shows: the row, its shows, the other
+    # side of each show, and how many of the shows are still upcoming
+    own_id, other, other_id = (
+        (Show.venue_id, Artist, Show.artist_id)
+        if model is Venue
+        else (Show.artist_id, Venue, Show.venue_id)
+    )
+    return (
+        db.session.query(
+            model.updated_at,
+            func.max(Show.updated_at),
+            func.max(other.updated_at),
+            func.count(Show.id),
+            func.count(case([(Show.start_time > datetime.now(), Show.id)])),
+        )
+        .outerjoin(Show, own_id == model.id)
+        .outerjoin(other, other_id == other.id)
+        .filter(model.id == entity_id)
+        .group_by(model.id)
+        .first()
+    )
+
+
+def conditional_page(model, id_arg):
+    # answers 304 Not Modified, before the page cache or any rendering, when
+    # the client's copy of a detail page is still current
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if session.get("_flashes"):
+                return view(**kwargs)
+            version = page_version(model, kwargs[id_arg])
+            if version is None:
+                return view(**kwargs)
+            etag = hashlib.sha1(repr(tuple(version)).encode()).hexdigest()
+            # no Last-Modified: deleted shows and shows moving from upcoming to
+            # past change the page without changing any updated_at
+            if is_resource_modified(request.environ, etag):
+                response = make_response(view(**kwargs))
+            else:
+                response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_pages(venue_ids=(), artist_ids=()):
+    if page_cache is not None:
+        page_cache.delete_many(
+            *[page_key("venue", venue_id) for venue_id in venue_ids],
+            *[page_key("artist", artist_id) for artist_id in artist_ids],
+        )
+
+
+def related_page_ids(venue_ids=(), artist_ids=()):
+    # venue and artist pages that list shows of the given venues or artists
+    stale_pages = {"venue_ids": set(venue_ids), "artist_ids": set(artist_ids)}
+    # only the distinct ids on the other side of the shows, not every show row
+    for ids, other_key, own, other in (
+        (venue_ids, "artist_ids", Show.venue_id, Show.artist_id),
+        (artist_ids, "venue_ids", Show.artist_id, Show.venue_id),
+    ):
+        if ids:
+            rows = db.session.query(other).filter(own.in_(ids)).distinct()
+            stale_pages[other_key].update(id for id, in rows)
+    return stale_pages
+
+
+def get_ids():
+    # ids from a JSON body {"ids": [...]} or from repeated ids= parameters
+    data = request.get_json(silent=True)
+    ids = data.get("ids") if isinstance(data, dict) else request.values.getlist("ids")
+    try:
+        ids = {int(id) for id in ids or ()}
+    except (TypeError, ValueError):
+        abort(400)
+    if not ids:
+        abort(400)
+    return ids
+
+
+def delete_many(model, ids):
+    # one DELETE for all the rows, with their shows removed by ON DELETE
+    # CASCADE; no mapper events fire, so facets and pages are updated here
+    if model is Venue:
+        stale_pages = related_page_ids(venue_ids=ids)
+    else:
+        stale_pages = related_page_ids(artist_ids=ids)
+    changes = Counter()
+    for genres, state in db.session.query(model.genres, model.state).filter(
+        model.id.in_(ids)
+    ):
+        changes.update(facets.count_changes(old=(genres, state)))
+    deleted = model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+    facets.apply_changes(
+        db.session.connection(),
+        FacetCount.__table__,
+        model.__tablename__.lower(),
+        changes,
+    )
+    db.session.commit()
+    invalidate_pages(**stale_pages)
+    name_indexes[model].delete(*ids)
+    return deleted
+
+
+def get_page(query, columns):
+    # keyset page of query ordered by columns, positioned by the request cursor
+    try:
+        return pagination.keyset_page(
+            query,
+            columns,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            per_page=app.config["LISTING_PAGE_SIZE"],
+        )
+    except ValueError:
+        abort(400)
+
+
+def get_facet_filters():
+    return {
+        "genre": request.args.get("genre") or None,
+        "state": request.args.get("state") or None,
+    }
+
+
+def get_venue_areas(*criterion):
+    # groups a page of venues by city/state with their upcoming show counts
+    upcoming = (
+        db.session.query(db.func.count(Show.id))
+        .filter(Show.venue_id == Venue.id, Show.start_time > datetime.now())
+        .correlate(Venue)
+        .as_scalar()
+    )
+    query = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        upcoming.label("num_upcoming_shows"),
+    ).filter(*criterion)
+    page = get_page(query, [Venue.state, Venue.city, Venue.name, Venue.id])
+    areas = []
+    for (city, state), venues in groupby(
+        page.items, key=lambda row: (row.city, row.state)
+    ):
+        areas.append(
+            {
+                "city": city,
+                "state": state,
+                "venues": [
+                    {
+                        "id": venue.id,
+                        "name": venue.name,
+                        "num_upcoming_shows": venue.num_upcoming_shows,
+                    }
+                    for venue in venues
+                ],
+            }
+        )
+    return areas, page
+
+
+app.jinja_env.filters["datetime"] = formatting.format_datetime
 
 
 @app.route("/")
@@ -103,37 +498,35 @@ def index():
 
 
 @app.route("/venues")
+@routing.read_only
 def venues():
-    areas = Venue.query.distinct("city", "state").all()
-    data = []
-    for area in areas:
-        venues = Venue.query.filter(
-            Venue.city == area.city, Venue.state == area.state
-        ).all()
-        data.append({"city": area.city, "state": area.state, "venues": venues})
-    return render_template("pages/venues.html", areas=data)
+    filters = get_facet_filters()
+    areas, page = get_venue_areas(*facets.filter_criteria(db.session, Venue, **filters))
+    return render_template(
+        "pages/venues.html",
+        areas=areas,
+        page=page,
+        filters=filters,
+        facets=facets.get_facets(db.session, FacetCount.__table__, "venue"),
+    )
 
 
 @app.route("/venues/search", methods=["POST"])
+@routing.read_only
 def search_venues():
-    search_term = request.form.get("search_term", "")
-    search_result = Venue.query.filter(Venue.name.ilike(f"%{search_term.lower()}%"))
-    response = {
-        "count": search_result.count(),
-        "data": [{"id": result.id, "name": result.name} for result in search_result],
-    }
     return render_template(
-        "pages/search_venues.html", results=response, search_term=search_term
+        "pages/search_venues.html",
+        results=search_results(Venue),
+        search_term=request.form.get("search_term", ""),
     )
 
 
 @app.route("/venues/<int:venue_id>")
+@routing.read_only
+@conditional_page(Venue, "venue_id")
+@cached_page("venue", "venue_id")
 def show_venue(venue_id):
-    shows = Show.query.filter(Show.venue_id == venue_id)
-    upcoming_shows = shows.filter(Show.start_time > str(datetime.now())).all()
-    upcoming_shows = [get_show_info(show) for show in upcoming_shows]
-    past_shows = shows.filter(Show.start_time < str(datetime.now())).all()
-    past_shows = [get_show_info(show) for show in past_shows]
+    upcoming_shows, past_shows = get_upcoming_and_past_shows(Show.venue_id == venue_id)
 
     venue = Venue.query.get(venue_id)
     venue = {
@@ -169,6 +562,8 @@ def create_venue_submission():
             form.populate_obj(venue)
             db.session.add(venue)
             db.session.commit()
+            invalidate_pages(venue_ids=[venue.id])
+            name_indexes[Venue].set(venue.id, venue.name)
             flash(f"Succesfully listed {venue.name} (ID: {venue.id})")
             return redirect(url_for("index"))
         except:
@@ -186,8 +581,11 @@ def create_venue_submission():
 def delete_venue(venue_id):
     try:
         venue = Venue.query.get(venue_id)
+        stale_pages = related_page_ids(venue_ids=[venue.id])
         db.session.delete(venue)
         db.session.commit()
+        invalidate_pages(**stale_pages)
+        name_indexes[Venue].delete(venue.id)
     except:
         db.session.rollback()
         flash("An error occurred. Artist could not be deleted.")
@@ -197,31 +595,46 @@ def delete_venue(venue_id):
     return redirect(url_for("index"))
 
 
+@app.route("/venues", methods=["DELETE"])
+def delete_venues():
+    return jsonify({"deleted": delete_many(Venue, get_ids())})
+
+
 @app.route("/artists")
+@routing.read_only
 def artists():
-    return render_template("pages/artists.html", artists=Artist.query.all())
+    filters = get_facet_filters()
+    query = db.session.query(Artist.id, Artist.name).filter(
+        *facets.filter_criteria(db.session, Artist, **filters)
+    )
+    page = get_page(query, [Artist.name, Artist.id])
+    return render_template(
+        "pages/artists.html",
+        artists=page.items,
+        page=page,
+        filters=filters,
+        facets=facets.get_facets(db.session, FacetCount.__table__, "artist"),
+    )
 
 
 @app.route("/artists/search", methods=["POST"])
+@routing.read_only
 def search_artists():
-    search_term = request.form.get("search_term", "")
-    search_result = Artist.query.filter(Artist.name.ilike(f"%{search_term.lower()}%"))
-    response = {
-        "count": search_result.count(),
-        "data": [{"id": result.id, "name": result.name} for result in search_result],
-    }
     return render_template(
-        "pages/search_artists.html", results=response, search_term=search_term
+        "pages/search_artists.html",
+        results=search_results(Artist),
+        search_term=request.form.get("search_term", ""),
     )
 
 
 @app.route("/artists/<int:artist_id>")
+@routing.read_only
+@conditional_page(Artist, "artist_id")
+@cached_page("artist", "artist_id")
 def show_artist(artist_id):
-    shows = Show.query.filter(Show.artist_id == artist_id)
-    upcoming_shows = shows.filter(Show.start_time > str(datetime.now())).all()
-    upcoming_shows = [get_show_info(show) for show in upcoming_shows]
-    past_shows = shows.filter(Show.start_time < str(datetime.now())).all()
-    past_shows = [get_show_info(show) for show in past_shows]
+    upcoming_shows, past_shows = get_upcoming_and_past_shows(
+        Show.artist_id == artist_id
+    )
 
     artist = Artist.query.get(artist_id)
     artist.genres = set(artist.genres)
@@ -246,6 +659,8 @@ def edit_artist_submission(artist_id):
             form.populate_obj(artist)
             db.session.add(artist)
             db.session.commit()
+            invalidate_pages(**related_page_ids(artist_ids=[artist_id]))
+            name_indexes[Artist].set(artist.id, artist.name)
             flash(f"Succesfully edited {artist.name} (ID: {artist.id})")
             return redirect(url_for("show_artist", artist_id=artist_id))
         except:
@@ -264,8 +679,11 @@ def edit_artist_submission(artist_id):
 def delete_artist(artist_id):
     try:
         artist = Artist.query.get(artist_id)
+        stale_pages = related_page_ids(artist_ids=[artist.id])
         db.session.delete(artist)
         db.session.commit()
+        invalidate_pages(**stale_pages)
+        name_indexes[Artist].delete(artist.id)
     except:
         db.session.rollback()
         flash("An error occurred. Artist could not be deleted.")
@@ -275,6 +693,11 @@ def delete_artist(artist_id):
     return redirect(url_for("index"))
 
 
+@app.route("/artists", methods=["DELETE"])
+def delete_artists():
+    return jsonify({"deleted": delete_many(Artist, get_ids())})
+
+
 @app.route("/venues/<int:venue_id>/edit", methods=["GET"])
 def edit_venue(venue_id):
     venue = Venue.query.get(venue_id)
@@ -291,6 +714,8 @@ def edit_venue_submission(venue_id):
             form.populate_obj(venue)
             db.session.add(venue)
             db.session.commit()
+            invalidate_pages(**related_page_ids(venue_ids=[venue_id]))
+            name_indexes[Venue].set(venue.id, venue.name)
             flash(f"Succesfully edited {venue.name} (ID: {venue.id})")
             return redirect(url_for("show_venue", venue_id=venue_id))
         except:
@@ -317,6 +742,8 @@ def create_artist_submission():
             form.populate_obj(artist)
             db.session.add(artist)
             db.session.commit()
+            invalidate_pages(artist_ids=[artist.id])
+            name_indexes[Artist].set(artist.id, artist.name)
             flash(f"Succesfully listed {artist.name} (ID: {artist.id})")
             return redirect(url_for("index"))
         except:
@@ -330,11 +757,19 @@ def create_artist_submission():
         return redirect(url_for("index"))
 
 
+@app.route("/api/autocomplete/<any(artists, venues):entity>")
+def autocomplete_names(entity):
+    index = name_indexes[Venue if entity == "venues" else Artist]
+    limit = min(request.args.get("limit", 10, type=int), 50)
+    return jsonify({"data": index.search(request.args.get("q", ""), limit)})
+
+
 @app.route("/shows")
+@routing.read_only
 def shows():
-    shows = Show.query.all()
-    shows = [get_show_info(show) for show in shows]
-    return render_template("pages/shows.html", shows=shows)
+    page = get_page(query_shows_info(), [Show.start_time, Show.id])
+    shows = [format_show_info(row) for row in page.items]
+    return render_template("pages/shows.html", shows=shows, page=page)
 
 
 @app.route("/shows/create")
@@ -350,20 +785,32 @@ def create_show_submission():
     if form.validate_on_submit():
         artist_id = form.artist_id.data
         venue_id = form.venue_id.data
-        artist = Artist.query.get(artist_id)
-        venue = Venue.query.get(form.venue_id.data)
-        if artist is None:
+        start_time = form.start_time.data
+        end_time = start_time + timedelta(minutes=form.duration.data)
+        artist_exists, venue_exists, artist_busy, venue_busy = check_booking(
+            artist_id, venue_id, start_time, end_time
+        )
+        if not artist_exists:
             flash(f"Invalid artist ID {artist_id}")
-        if venue is None:
+        if not venue_exists:
             flash(f"Invalid venue ID {venue_id}")
-        if not (venue and artist):
+        if artist_busy:
+            flash(f"Artist {artist_id} already has a show at that time")
+        if venue_busy:
+            flash(f"Venue {venue_id} is already booked at that time")
+        if not (venue_exists and artist_exists) or artist_busy or venue_busy:
             flash("retry")
             return redirect(url_for("create_shows"))
         try:
-            show = Show()
-            form.populate_obj(show)
+            show = Show(
+                artist_id=artist_id,
+                venue_id=venue_id,
+                start_time=start_time,
+                end_time=end_time,
+            )
             db.session.add(show)
             db.session.commit()
+            invalidate_pages(venue_ids=[show.venue_id], artist_ids=[show.artist_id])
             flash(f"Succesfully listed show")
             return redirect(url_for("shows"))
         except:
@@ -377,6 +824,294 @@ def create_show_submission():
         return redirect(url_for("index"))
 
 
+def export_columns():
+    return {
+        "venues": [
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            Venue.state,
+            Venue.address,
+            Venue.phone,
+            Venue.genres,
+            Venue.website,
+            Venue.image_link,
+            Venue.facebook_link,
+            Venue.seeking_talent,
+            Venue.seeking_description,
+        ],
+        "artists": [
+            Artist.id,
+            Artist.name,
+            Artist.city,
+            Artist.state,
+            Artist.phone,
+            Artist.genres,
+            Artist.website,
+            Artist.image_link,
+            Artist.facebook_link,
+            Artist.seeking_venue,
+            Artist.seeking_description,
+        ],
+        "shows": [
+            Show.id,
+            Show.venue_id,
+            Show.artist_id,
+            Show.start_time,
+            Show.end_time,
+        ],
+    }
+
+
+@app.route("/export/<any(venues, artists, shows):entity>")
+@routing.read_only
+def export_entities(entity):
+    format = request.args.get("format", "ndjson")
+    if format not in export.MIMETYPES:
+        abort(400)
+    columns = export_columns()[entity]
+    query = db.session.query(*columns).order_by(columns[0])
+    return Response(
+        stream_with_context(
+            export.stream(query, format, app.config["EXPORT_BATCH_SIZE"])
+        ),
+        mimetype=export.MIMETYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={entity}.{format}"},
+    )
+
+
+fyyur_cli = AppGroup("fyyur", help="Fyyur data management commands.")
+app.cli.add_command(fyyur_cli)
+
+IMPORTS = {
+    "venues": (Venue, VenueForm),
+    "artists": (Artist, ArtistForm),
+    "shows": (Show, ShowForm),
+}
+
+
+def resolve_show_references(batch):
+    # maps each show's artist and venue ids or names with one query per model
+    errors = defaultdict(list)
+    for model, key in ((Artist, "artist"), (Venue, "venue")):
+        ids, names = set(), set()
+        for line, row in batch:
+            if row.get(f"{key}_id"):
+                try:
+                    row[f"{key}_id"] = int(row[f"{key}_id"])
+                    ids.add(row[f"{key}_id"])
+                except (TypeError, ValueError):
+                    errors[line].append(f"Invalid {key} ID {row[f'{key}_id']}")
+            elif row.get(f"{key}_name"):
+                names.add(row[f"{key}_name"])
+        known_ids, ids_by_name = set(), defaultdict(list)
+        rows = db.session.query(model.id, model.name).filter(
+            db.or_(model.id.in_(ids), model.name.in_(names))
+        )
+        for id, name in rows:
+            known_ids.add(id)
+            ids_by_name[name].append(id)
+        for line, row in batch:
+            if isinstance(row.get(f"{key}_id"), int):
+                if row[f"{key}_id"] not in known_ids:
+                    errors[line].append(f"Invalid {key} ID {row[f'{key}_id']}")
+            elif row.get(f"{key}_name"):
+                matches = ids_by_name.get(row[f"{key}_name"], [])
+                if len(matches) == 1:
+                    row[f"{key}_id"] = matches[0]
+                else:
+                    errors[line].append(
+                        f"{len(matches)} {key}s named {row[f'{key}_name']!r}"
+                    )
+    return errors
+
+
+def booking_conflicts(mappings):
+    # checks show mappings against existing shows and each other, loading the
+    # nearby shows of every venue and artist involved with one query
+    starts = [mapping["start_time"] for mapping in mappings]
+    ends = [mapping["end_time"] for mapping in mappings]
+    booked = defaultdict(list)
+    rows = db.session.query(
+        Show.venue_id, Show.artist_id, Show.start_time, Show.end_time
+    ).filter(
+        db.or_(
+            Show.venue_id.in_({mapping["venue_id"] for mapping in mappings}),
+            Show.artist_id.in_({mapping["artist_id"] for mapping in mappings}),
+        ),
+        overlapping_shows(min(starts), max(ends)),
+    )
+    for venue_id, artist_id, start_time, end_time in rows:
+        booked["venue", venue_id].append((start_time, end_time))
+        booked["artist", artist_id].append((start_time, end_time))
+    conflicts = {}
+    for index, mapping in enumerate(mappings):
+        start_time, end_time = mapping["start_time"], mapping["end_time"]
+        if not start_time <= end_time <= start_time + MAX_SHOW_DURATION:
+            conflicts[index] = f"Invalid end_time {end_time}"
+            continue
+        for key in ("venue", "artist"):
+            id = mapping[f"{key}_id"]
+            if any(s < end_time and e > start_time for s, e in booked[key, id]):
+                conflicts[index] = f"{key} {id} is already booked at {start_time}"
+                break
+        else:
+            booked["venue", mapping["venue_id"]].append((start_time, end_time))
+            booked["artist", mapping["artist_id"]].append((start_time, end_time))
+    return conflicts
+
+
+def import_mapping(model, row):
+    mapping = {
+        column.key: row[column.key]
+        for column in model.__table__.columns
+        if column.key in row and column.key != "search_document"
+    }
+    if mapping.get("id") is not None:
+        mapping["id"] = int(mapping["id"])
+    else:
+        mapping.pop("id", None)
+    if model is Show:
+        mapping["start_time"] = formatting.parse_datetime(mapping["start_time"])
+        if row.get("end_time"):
+            mapping["end_time"] = formatting.parse_datetime(row["end_time"])
+        else:
+            duration = int(row.get("duration") or DEFAULT_SHOW_MINUTES)
+            mapping["end_time"] = mapping["start_time"] + timedelta(minutes=duration)
+    else:
+        mapping["search_document"] = search.build_document(
+            row.get("name"), row.get("city"), row.get("state"), row.get("genres")
+        )
+    return mapping
+
+
+def taken_ids(model, mappings):
+    # indexes of the mappings whose id is in the database or earlier in the batch
+    ids = {mapping["id"] for mapping in mappings if "id" in mapping}
+    taken = {id for id, in db.session.query(model.id).filter(model.id.in_(ids))}
+    indexes = set()
+    for index, mapping in enumerate(mappings):
+        if "id" in mapping:
+            if mapping["id"] in taken:
+                indexes.add(index)
+            taken.add(mapping["id"])
+    return indexes
+
+
+def write_mappings(model, mappings, use_copy):
+    if use_copy:
+        # COPY takes one column list, so rows with and without ids go apart
+        for group in (
+            [mapping for mapping in mappings if "id" in mapping],
+            [mapping for mapping in mappings if "id" not in mapping],
+        ):
+            if group:
+                columns = [c.key for c in model.__table__.columns if c.key in group[0]]
+                importer.copy_rows(
+                    db.session.connection(), model.__table__, columns, group
+                )
+    else:
+        db.session.bulk_insert_mappings(model, mappings)
+    if db.engine.dialect.name == "postgresql" and any("id" in m for m in mappings):
+        # explicit ids don't advance the sequence that numbers new rows
+        table = model.__tablename__
+        db.session.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f'(SELECT max(id) FROM "{table}"))'
+        )
+    # bulk writes skip the mapper events, so keep facets and pages in step here
+    if model is Show:
+        invalidate_pages(
+            venue_ids={mapping["venue_id"] for mapping in mappings},
+            artist_ids={mapping["artist_id"] for mapping in mappings},
+        )
+    else:
+        changes = Counter()
+        for mapping in mappings:
+            changes.update(
+                facets.count_changes(new=(mapping.get("genres"), mapping["state"]))
+            )
+        facets.apply_changes(
+            db.session.connection(),
+            FacetCount.__table__,
+            model.__tablename__.lower(),
+            changes,
+        )
+        name_indexes[model].invalidate()
+    db.session.commit()
+
+
+@fyyur_cli.command("import")
+@click.argument("entity", type=click.Choice(list(IMPORTS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    type=click.Choice(["csv", "ndjson"]),
+    help="File format, guessed from the extension by default.",
+)
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option(
+    "--copy/--no-copy", default=True, help="Use COPY when the database is Postgres."
+)
+def import_command(entity, path, format, batch_size, copy):
+    """Bulk loads venues, artists or shows from a CSV or NDJSON file.
+
+    Rows are validated with the same forms as the create pages and invalid
+    rows are reported and skipped. Rows keep their id when they have one and
+    are skipped if it is taken. Shows reference their artist and venue
+    either by artist_id/venue_id or by artist_name/venue_name, so import
+    exported venues and artists before their shows.
+    """
+    model, form_class = IMPORTS[entity]
+    use_copy = copy and db.engine.dialect.name == "postgresql"
+    imported = skipped = 0
+    started = time.perf_counter()
+    for batch in importer.batches(importer.read_rows(path, format), batch_size):
+        for line, row in batch:
+            if isinstance(row, importer.InvalidRow):
+                click.echo(f"{path}:{line}: {row.error}", err=True)
+                skipped += 1
+        batch = [item for item in batch if not isinstance(item[1], importer.InvalidRow)]
+        errors = resolve_show_references(batch) if model is Show else {}
+        mappings = []
+        for line, row in batch:
+            row_errors = errors.get(line) or importer.validate(form_class, row)
+            if row_errors:
+                click.echo(f"{path}:{line}: {row_errors}", err=True)
+                skipped += 1
+            else:
+                mappings.append((line, import_mapping(model, row)))
+        for index in sorted(taken_ids(model, [m for _, m in mappings]), reverse=True):
+            line, mapping = mappings.pop(index)
+            click.echo(f"{path}:{line}: ID {mapping['id']} already exists", err=True)
+            skipped += 1
+        if model is Show and mappings:
+            conflicts = booking_conflicts([mapping for _, mapping in mappings])
+            for index, message in sorted(conflicts.items()):
+                click.echo(f"{path}:{mappings[index][0]}: {message}", err=True)
+            skipped += len(conflicts)
+            mappings = [m for i, m in enumerate(mappings) if i not in conflicts]
+        mappings = [mapping for _, mapping in mappings]
+        if mappings:
+            write_mappings(model, mappings, use_copy)
+            imported += len(mappings)
+    elapsed = time.perf_counter() - started
+    click.echo(
+        f"Imported {imported} {entity} in {elapsed:.2f}s "
+        f"({imported / elapsed:.0f} rows/s), skipped {skipped} invalid rows"
+    )
+
+
+@fyyur_cli.command("assets")
+def build_assets():
+    """Fingerprints and precompresses the files under static/.
+
+    Restart the app afterwards so templates pick up the new manifest.
+    """
+    manifest = assets.build(app.static_folder)
+    click.echo(f"Built {len(manifest)} assets into static/{assets.BUILD_DIR}/")
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
@@ -388,15 +1123,7 @@ def server_error(error):
 
 
 if not app.debug:
-    file_handler = logging.FileHandler("error.log")
-    file_handler.setFormatter(
-        logging.Formatter(
-            "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
-        )
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
+    queued_logging = logs.QueuedLogging(app)
     app.logger.info("errors")
 
 
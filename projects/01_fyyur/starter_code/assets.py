@@ -0,0 +1,140 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask fyyur assets`` copies every file under static/ to static/build/
+with a content hash in its name, writes gzip and brotli variants of the
+compressible ones and records them in static/build/manifest.json.
+Templates link assets with ``asset_url``, which returns the hashed URL
+when the manifest has one, and the static route serves hashed files in
+the best encoding the client accepts with immutable cache headers. The
+manifest is read at startup, so restart the app after a build.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import brotli
+from flask import request, send_from_directory, url_for
+
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".ttf", ".otf", ".eot", ".json", ".txt"}
+# In order of preference when the client accepts several.
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+CSS_URL = re.compile(r"""url\((["']?)([^"')]+)\1\)""")
+EXTERNAL_URL = re.compile(r"^([a-z]+:|/)", re.IGNORECASE)
+
+
+def hashed_name(path, content):
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content)
+    return gzip.compress(content, 9, mtime=0)
+
+
+def rewrite_css_urls(path, content, manifest):
+    """Points the relative url() references of a stylesheet at hashed files."""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        quote, target = match.groups()
+        if EXTERNAL_URL.match(target):
+            return match.group(0)
+        name, suffix = re.match(r"([^?#]*)(.*)", target).groups()
+        entry = manifest.get(posixpath.normpath(posixpath.join(directory, name)))
+        if entry is None:
+            return match.group(0)
+        hashed = posixpath.relpath(entry["path"], posixpath.join(BUILD_DIR, directory))
+        return f"url({quote}{hashed}{suffix}{quote})"
+
+    return CSS_URL.sub(replace, content.decode("utf-8")).encode("utf-8")
+
+
+def source_files(static_folder):
+    for directory, dirnames, filenames in os.walk(static_folder):
+        if directory == static_folder and BUILD_DIR in dirnames:
+            dirnames.remove(BUILD_DIR)
+        for filename in filenames:
+            path = os.path.relpath(os.path.join(directory, filename), static_folder)
+            yield path.replace(os.sep, "/")
+
+
+def build(static_folder):
+    """Writes the hashed and compressed assets and returns the manifest."""
+    # stylesheets go last so their url()s can point at already hashed files
+    paths = sorted(source_files(static_folder), key=lambda p: p.endswith(".css"))
+    manifest = {}
+    for path in paths:
+        with open(os.path.join(static_folder, path), "rb") as f:
+            content = f.read()
+        if path.endswith(".css"):
+            content = rewrite_css_urls(path, content, manifest)
+        target = posixpath.join(BUILD_DIR, hashed_name(path, content))
+        variants = {"": content}
+        if posixpath.splitext(path)[1] in COMPRESSIBLE:
+            for encoding, suffix in ENCODINGS.items():
+                compressed = compress(content, encoding)
+                if len(compressed) < len(content):
+                    variants[suffix] = compressed
+        os.makedirs(os.path.dirname(os.path.join(static_folder, target)), exist_ok=True)
+        for suffix, data in variants.items():
+            with open(os.path.join(static_folder, target + suffix), "wb") as f:
+                f.write(data)
+        manifest[path] = {
+            "path": target,
+            "encodings": [e for e, s in ENCODINGS.items() if s in variants],
+        }
+    with open(os.path.join(static_folder, BUILD_DIR, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.hashed = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        path = os.path.join(app.static_folder, BUILD_DIR, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+        self.hashed = {entry["path"]: entry for entry in self.manifest.values()}
+        app.jinja_env.globals["asset_url"] = self.url
+        app.view_functions["static"] = self.send_static_file
+
+    def url(self, filename):
+        entry = self.manifest.get(filename)
+        return url_for("static", filename=entry["path"] if entry else filename)
+
+    def send_static_file(self, filename):
+        entry = self.hashed.get(filename)
+        if entry is None:
+            return self.app.send_static_file(filename)
+        encoding = next(
+            (e for e in entry["encodings"] if e in request.accept_encodings), None
+        )
+        response = send_from_directory(
+            self.app.static_folder,
+            filename + ENCODINGS.get(encoding, ""),
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=IMMUTABLE_MAX_AGE,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
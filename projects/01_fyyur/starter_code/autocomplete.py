@@ -0,0 +1,119 @@
+"""In-process name index for the artist and venue autocomplete API.
+
+Each worker keeps a sorted list of (normalized name, id) keys, one for the
+full name and one starting at each later word, so "note" finds "The Blue
+Note". Lookups are a binary search and never touch the database: the
+index loads in a background thread on first use and finds nothing until
+that load finishes. The create/edit/delete handlers keep it current, and
+it reloads in the background every refresh interval to pick up writes
+made by other workers.
+"""
+
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def name_keys(name):
+    words = normalize(name).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    def __init__(self, loader, refresh_interval=300):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.loaded_at = None
+        self._keys = []
+        self._names = {}
+        self._journal = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Rebuilds the index from loader(), an iterable of (id, name)."""
+        with self._load_lock:
+            with self._lock:
+                self._journal = []
+            names = {id: name for id, name in self.loader()}
+            keys = sorted(
+                (key, id) for id, name in names.items() for key in name_keys(name)
+            )
+            with self._lock:
+                self._keys, self._names = keys, names
+                # changes made while loading may be missing from the snapshot
+                journal, self._journal = self._journal, None
+                for id, name in journal:
+                    self._replace(id, name)
+                self.loaded_at = time.monotonic()
+
+    def refresh(self):
+        """Reloads in a background thread, unless a reload is running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.load()
+        finally:
+            self._refreshing = False
+
+    def search(self, prefix, limit=10):
+        if (
+            self.loaded_at is None
+            or time.monotonic() - self.loaded_at > self.refresh_interval
+        ):
+            self.refresh()
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(results) < limit:
+                key, id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if id not in seen:
+                    seen.add(id)
+                    results.append({"id": id, "name": self._names[id]})
+                position += 1
+        return results
+
+    def set(self, id, name):
+        with self._lock:
+            self._replace(id, name)
+
+    def delete(self, *ids):
+        with self._lock:
+            for id in ids:
+                self._replace(id, None)
+
+    def invalidate(self):
+        """Reloads on the next search, after bulk writes the handlers can't see."""
+        self.loaded_at = float("-inf")
+
+    def _replace(self, id, name):
+        if self._journal is not None:
+            self._journal.append((id, name))
+        old = self._names.pop(id, None)
+        if old is not None:
+            for key in name_keys(old):
+                position = bisect_left(self._keys, (key, id))
+                if position < len(self._keys) and self._keys[position] == (key, id):
+                    del self._keys[position]
+        if name is not None:
+            self._names[id] = name
+            for key in name_keys(name):
+                insort(self._keys, (key, id))
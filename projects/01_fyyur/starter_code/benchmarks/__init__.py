@@ -0,0 +1 @@
+"""Benchmarks for Fyyur. Run each module with ``python -m benchmarks.<name>``."""
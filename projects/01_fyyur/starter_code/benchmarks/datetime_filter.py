@@ -0,0 +1,58 @@
+"""Compares the memoized datetime filter with the original implementation.
+
+    python -m benchmarks.datetime_filter --shows 500 --renders 200
+
+Each render formats every show start time once with the "full" format,
+as /shows and the detail pages do.
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+import formatting
+
+
+def legacy_format_datetime(value, format="medium"):
+    # the filter as it was before formatting.format_datetime
+    date = dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shows", type=int, default=500)
+    parser.add_argument("--renders", type=int, default=200)
+    args = parser.parse_args()
+
+    start = datetime(2020, 1, 1, 20, 0)
+    values = [str(start + timedelta(hours=6 * i)) for i in range(args.shows)]
+
+    def render(filter):
+        return [filter(value, "full") for value in values]
+
+    def render_cold():
+        # compiled patterns and fast parsing only, without memoized results
+        formatting.format_datetime.cache_clear()
+        return render(formatting.format_datetime)
+
+    for name, run in (
+        ("legacy", lambda: render(legacy_format_datetime)),
+        ("cold", render_cold),
+        ("memoized", lambda: render(formatting.format_datetime)),
+    ):
+        formatting.format_datetime.cache_clear()
+        seconds = timeit.timeit(run, number=args.renders)
+        per_value = seconds / (args.shows * args.renders) * 1e6
+        print(f"{name:>9}: {seconds:8.3f}s total, {per_value:8.2f}us per value")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compares log call latency with a plain FileHandler and with queued logging.
+
+    python -m benchmarks.logging_handlers --threads 16 --records 2000 --disk-latency-ms 2
+
+Each thread logs records as a request handler would and times every call.
+--disk-latency-ms stands in for a slow or busy disk by sleeping on every
+write, which a FileHandler does in the logging thread while holding its
+lock, and the QueueListener does on its own thread.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from logging.handlers import QueueListener
+
+import logs
+
+
+class SlowStream:
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text):
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def file_logger(path, latency):
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(logs.TEXT_FORMAT))
+    handler.stream = SlowStream(handler.stream, latency)
+    return handler, handler.close
+
+
+def queued_logger(path, latency):
+    config = {
+        "LOG_FILE": path,
+        "LOG_FORMAT": "json",
+        "LOG_MAX_BYTES": 100 * 1024 * 1024,
+        "LOG_BACKUP_COUNT": 1,
+    }
+    file_handler = logs.create_file_handler(config)
+    file_handler.stream = SlowStream(file_handler.stream, latency)
+    # unbounded here so that no records are dropped from the comparison
+    handler = logs.NonBlockingQueueHandler(queue.Queue())
+    listener = QueueListener(handler.queue, file_handler)
+    listener.start()
+
+    def close():
+        listener.stop()
+        file_handler.close()
+
+    return handler, close
+
+
+def run(make_handler, threads, records, latency):
+    path = os.path.join(tempfile.mkdtemp(), "bench.log")
+    handler, close = make_handler(path, latency)
+    logger = logging.getLogger(f"benchmark.{make_handler.__name__}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    latencies = [[] for _ in range(threads)]
+
+    def work(timings):
+        for i in range(records):
+            started = time.perf_counter()
+            logger.info("GET /venues/%d 200", i)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    workers = [threading.Thread(target=work, args=(t,)) for t in latencies]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    logger.removeHandler(handler)
+    close()
+    values = [value for timings in latencies for value in timings]
+    cuts = statistics.quantiles(values, n=1000)
+    return {
+        "p50_ms": cuts[499],
+        "p99_ms": cuts[989],
+        "p999_ms": cuts[998],
+        "max_ms": max(values),
+        "calls_per_s": len(values) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--records", type=int, default=2000, help="Per thread.")
+    parser.add_argument("--disk-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'handler':<10}{'p50 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}"
+        f"{'max ms':>10}{'calls/s':>12}"
+    )
+    for make_handler in (file_logger, queued_logger):
+        result = run(
+            make_handler, args.threads, args.records, args.disk_latency_ms / 1000
+        )
+        print(
+            f"{make_handler.__name__.split('_')[0]:<10}{result['p50_ms']:>10.3f}"
+            f"{result['p99_ms']:>10.3f}{result['p999_ms']:>10.3f}"
+            f"{result['max_ms']:>10.3f}{result['calls_per_s']:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
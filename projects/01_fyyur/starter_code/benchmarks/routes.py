@@ -0,0 +1,194 @@
+"""Measures latency, throughput and query counts of the Fyyur routes.
+
+    python -m benchmarks.routes --database-url postgresql:///fyyur_bench \\
+        --seed-shows 100000 --requests 200 --output run.json --baseline base.json
+
+Requests go through the Flask test client, or through a local WSGI server
+with --server. Query counts come from the Server-Timing header. Results
+are written as JSON and, given a baseline file, compared with it.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from werkzeug.serving import make_server
+
+import app as fyyur
+from benchmarks import seed
+
+SEARCH_TERMS = ["blue", "lounge", "springfield", "jazz", "ny", "velvet hall"]
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[rank]
+
+
+def scenarios(counts, rng):
+    """Returns {name: function returning (method, path, form data)}."""
+    return {
+        "venues": lambda: ("GET", "/venues", None),
+        "artists": lambda: ("GET", "/artists", None),
+        "shows": lambda: ("GET", "/shows", None),
+        "search_venues": lambda: (
+            "POST",
+            "/venues/search",
+            {"search_term": rng.choice(SEARCH_TERMS)},
+        ),
+        "search_artists": lambda: (
+            "POST",
+            "/artists/search",
+            {"search_term": rng.choice(SEARCH_TERMS)},
+        ),
+        "show_venue": lambda: (
+            "GET",
+            f"/venues/{rng.randint(1, counts['venues'])}",
+            None,
+        ),
+        "show_artist": lambda: (
+            "GET",
+            f"/artists/{rng.randint(1, counts['artists'])}",
+            None,
+        ),
+    }
+
+
+class TestClientDriver:
+    def __init__(self):
+        self.client = fyyur.app.test_client()
+
+    def request(self, method, path, data):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get("Server-Timing", "")
+
+    def close(self):
+        pass
+
+
+class ServerDriver:
+    def __init__(self):
+        self.server = make_server("127.0.0.1", 0, fyyur.app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def request(self, method, path, data):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        request = urllib.request.Request(self.base_url + path, body, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, response.headers.get("Server-Timing", "")
+        except urllib.error.HTTPError as error:
+            # 4xx/5xx responses count as errors rather than ending the run
+            with error:
+                error.read()
+                return error.code, error.headers.get("Server-Timing", "")
+
+    def close(self):
+        self.server.shutdown()
+
+
+def query_count(server_timing):
+    match = re.search(r'desc="(\d+) queries"', server_timing)
+    return int(match.group(1)) if match else None
+
+
+def run(driver, scenario, requests):
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, path, data = scenario()
+        request_started = time.perf_counter()
+        status, server_timing = driver.request(method, path, data)
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        errors += status >= 400
+        if query_count(server_timing) is not None:
+            queries.append(query_count(server_timing))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": requests / elapsed,
+        "mean_queries": sum(queries) / len(queries) if queries else None,
+        "max_queries": max(queries) if queries else None,
+    }
+
+
+def compare(results, baseline):
+    print(f"{'route':<16}{'p95 ms':>10}{'baseline':>10}{'change':>9}{'queries':>9}")
+    for name, result in results["routes"].items():
+        base = baseline["routes"].get(name)
+        line = f"{name:<16}{result['p95_ms']:>10.2f}"
+        if base:
+            change = (result["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+            line += f"{base['p95_ms']:>10.2f}{change:>+8.1f}%"
+        else:
+            line += f"{'-':>10}{'-':>9}"
+        print(line + f"{result['mean_queries'] or 0:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument(
+        "--seed-shows", type=int, help="Reseed the database with this many shows."
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Per route.")
+    parser.add_argument("--routes", nargs="*", help="Defaults to every route.")
+    parser.add_argument("--server", action="store_true", help="Use a WSGI server.")
+    parser.add_argument("--no-page-cache", action="store_true")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with a previous JSON file.")
+    args = parser.parse_args(argv)
+
+    fyyur.app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    if args.no_page_cache:
+        fyyur.page_cache = None
+    with fyyur.app.app_context():
+        if args.seed_shows:
+            seed.seed(args.seed_shows)
+        counts = {
+            "venues": fyyur.Venue.query.count(),
+            "artists": fyyur.Artist.query.count(),
+            "shows": fyyur.Show.query.count(),
+        }
+        fyyur.db.session.remove()
+
+    rng = random.Random(0)
+    all_scenarios = scenarios(counts, rng)
+    driver = ServerDriver() if args.server else TestClientDriver()
+    results = {
+        "counts": counts,
+        "driver": "server" if args.server else "test_client",
+        "page_cache": fyyur.page_cache is not None,
+        "routes": {},
+    }
+    try:
+        for name in args.routes or all_scenarios:
+            results["routes"][name] = run(driver, all_scenarios[name], args.requests)
+    finally:
+        driver.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
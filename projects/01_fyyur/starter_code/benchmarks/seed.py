@@ -0,0 +1,106 @@
+"""Seeds a local Fyyur database with synthetic venues, artists and shows.
+
+    python -m benchmarks.seed --database-url postgresql:///fyyur_bench --shows 100000
+
+Volumes scale from the number of shows: one venue per 20 shows and one
+artist per 10. Rows go through the same bulk path as ``flask fyyur
+import``, so search documents and facet counts are filled in too.
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask_migrate import downgrade, upgrade
+
+import app as fyyur
+import importer
+from data import genres, states
+
+MIGRATIONS = os.path.join(os.path.dirname(fyyur.__file__), "migrations")
+WORDS = (
+    "Blue Red Golden Velvet Electric Silver Midnight Crimson Hidden Wild Lucky "
+    "Lounge Hall Room Cellar Garden Club Theatre Tavern Stage Parlor Den Yard"
+).split()
+CITIES = "Springfield Riverside Fairview Franklin Greenville Bristol Clinton".split()
+GENRES = [value for value, _ in genres]
+STATES = [value for value, _ in states]
+
+
+def fake_name(rng, number):
+    return f"{rng.choice(WORDS)} {rng.choice(WORDS)} {number}"
+
+
+def fake_entity(rng, number, **extra):
+    return dict(
+        name=fake_name(rng, number),
+        city=rng.choice(CITIES),
+        state=rng.choice(STATES),
+        phone=f"555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}",
+        genres=rng.sample(GENRES, rng.randint(1, 3)),
+        image_link=f"https://example.com/{number}.jpg",
+        **extra,
+    )
+
+
+def fake_shows(rng, count, venue_count, artist_count):
+    # half the shows are in the past and half in the future, in three hour
+    # slots that no venue or artist is booked for twice
+    now = datetime.now().replace(microsecond=0)
+    booked = set()
+    while len(booked) < 2 * count:
+        venue_id = rng.randint(1, venue_count)
+        artist_id = rng.randint(1, artist_count)
+        slot = rng.randint(-8 * 365, 8 * 365)
+        if ("venue", venue_id, slot) in booked or ("artist", artist_id, slot) in booked:
+            continue
+        booked.update((("venue", venue_id, slot), ("artist", artist_id, slot)))
+        yield dict(
+            venue_id=venue_id,
+            artist_id=artist_id,
+            start_time=now + timedelta(hours=3 * slot),
+        )
+
+
+def insert(model, rows, batch_size):
+    use_copy = fyyur.db.engine.dialect.name == "postgresql"
+    for batch in importer.batches(rows, batch_size):
+        mappings = [fyyur.import_mapping(model, row) for row in batch]
+        fyyur.write_mappings(model, mappings, use_copy)
+
+
+def seed(shows, batch_size=5000, seed=0):
+    """Rebuilds the schema through the migrations, fills it and returns the counts."""
+    rng = random.Random(seed)
+    venue_count, artist_count = max(shows // 20, 1), max(shows // 10, 1)
+    downgrade(MIGRATIONS, "base")
+    upgrade(MIGRATIONS)
+    venues = (
+        fake_entity(rng, i, address=f"{i} Main St") for i in range(1, venue_count + 1)
+    )
+    insert(fyyur.Venue, venues, batch_size)
+    artists = (fake_entity(rng, i) for i in range(1, artist_count + 1))
+    insert(fyyur.Artist, artists, batch_size)
+    insert(fyyur.Show, fake_shows(rng, shows, venue_count, artist_count), batch_size)
+    return {"venues": venue_count, "artists": artist_count, "shows": shows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--shows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fyyur.app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    started = time.perf_counter()
+    with fyyur.app.app_context():
+        counts = seed(args.shows, args.batch_size, args.seed)
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Rendered page cache for the venue and artist detail pages.
+
+Two backends share the same get/set/delete_many interface: an in-process
+LRU for a single worker, and a directory on disk that every worker on the
+host reads, so an invalidation in one worker is seen by all of them.
+Entries also expire after a timeout because the upcoming/past split on a
+detail page changes as time passes.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024, timeout=300):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class DiskCache:
+    def __init__(self, directory, timeout=300):
+        self.directory = directory
+        self.timeout = timeout
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                expires = float(f.readline())
+                value = f.read()
+        except (OSError, ValueError):
+            return None
+        if expires < time.time():
+            self.delete_many(key)
+            return None
+        return value
+
+    def set(self, key, value):
+        # write to a temporary file first so readers never see a partial page
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{time.time() + self.timeout}\n")
+            f.write(value)
+        os.replace(tmp_path, self._path(key))
+
+    def delete_many(self, *keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+def create_cache(config):
+    """Returns the backend named by PAGE_CACHE_BACKEND, or None to disable."""
+    backend = config.get("PAGE_CACHE_BACKEND")
+    timeout = config.get("PAGE_CACHE_TIMEOUT", 300)
+    if backend == "lru":
+        return LRUCache(config.get("PAGE_CACHE_SIZE", 1024), timeout)
+    if backend == "disk":
+        return DiskCache(config["PAGE_CACHE_DIR"], timeout)
+    if backend is None:
+        return None
+    raise ValueError(f"Unknown page cache backend {backend!r}")
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
@@ -7,5 +8,64 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 # Enable debug mode.
 DEBUG = True
 
-SQLALCHEMY_DATABASE_URI = "postgres:///fyyur"
+SQLALCHEMY_DATABASE_URI = os.environ.get("FYYUR_DATABASE_URI", "postgres:///fyyur")
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Number of ranked results per search page.
+SEARCH_PAGE_SIZE = 20
+
+# Number of rows per page on the venue, artist and show listings.
+LISTING_PAGE_SIZE = 50
+
+# Rendered venue/artist page cache: "lru" keeps pages in each worker,
+# "disk" shares them between workers through PAGE_CACHE_DIR, None disables.
+PAGE_CACHE_BACKEND = "lru"
+PAGE_CACHE_SIZE = 1024
+PAGE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "fyyur-page-cache")
+PAGE_CACHE_TIMEOUT = 300
+
+# Rows fetched per server-side cursor batch by the /export endpoints.
+EXPORT_BATCH_SIZE = 1000
+
+# Slowest statements logged per request, and how many runs of one statement
+# within a request get it flagged as a likely N+1 query.
+SQL_SLOW_STATEMENTS = 5
+SQL_REPEAT_THRESHOLD = 5
+
+# Read replicas for the read_only views, picked round-robin. A replica that
+# fails its health check is skipped for REPLICA_HEALTH_INTERVAL seconds.
+# After a write, that client reads from the primary for REPLICA_STICKY_SECONDS,
+# which should cover the replication lag. Pages read from a replica are not
+# put in the page cache.
+SQLALCHEMY_REPLICA_URIS = os.environ.get("FYYUR_REPLICA_URIS", "").split()
+REPLICA_HEALTH_INTERVAL = 30
+REPLICA_STICKY_SECONDS = 5
+
+# Connection pool profiles for the primary and each replica. Sizing and the
+# statement timeout are ignored on SQLite.
+DATABASE_POOL = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+    "statement_timeout_ms": 30000,
+}
+REPLICA_POOL = dict(DATABASE_POOL, statement_timeout_ms=10000)
+
+# Seconds between background reloads of the artist/venue autocomplete index,
+# which picks up names written by other workers or 'flask fyyur import'.
+AUTOCOMPLETE_REFRESH = 300
+
+# Outside debug mode, log records are queued and written to LOG_FILE by a
+# background thread, as "text" or "json" lines with the request id. The file
+# rotates at LOG_MAX_BYTES, or at LOG_ROTATE_WHEN (e.g. "midnight") if set.
+# LOG_REQUESTS adds one record per request with its status and latency.
+LOG_FILE = "error.log"
+LOG_FORMAT = "text"
+LOG_LEVEL = "INFO"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_ROTATE_WHEN = None
+LOG_BACKUP_COUNT = 5
+LOG_QUEUE_SIZE = 10000
+LOG_REQUESTS = False
@@ -0,0 +1,51 @@
+"""Streaming NDJSON and CSV exports.
+
+Rows are read through a server-side cursor (``yield_per``) and written out
+in small chunks, so memory stays flat and the first chunk is sent before
+the rest of the result set has been read.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# list columns such as genres are joined with this in CSV cells
+LIST_SEPARATOR = ";"
+
+
+def to_json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def to_csv_value(value):
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(value)
+    return to_json_value(value)
+
+
+def stream(query, format, batch_size=1000):
+    """Yields the rows of a column query as NDJSON lines or CSV text."""
+    names = [column["name"] for column in query.column_descriptions]
+    rows = query.yield_per(batch_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == "csv" else None
+    if writer:
+        writer.writerow(names)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    for count, row in enumerate(rows, 1):
+        if writer:
+            writer.writerow([to_csv_value(value) for value in row])
+        else:
+            record = {name: to_json_value(value) for name, value in zip(names, row)}
+            buffer.write(json.dumps(record))
+            buffer.write("\n")
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
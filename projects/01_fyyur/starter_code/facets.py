@@ -0,0 +1,91 @@
+"""Genre and state facets for the venue and artist listings.
+
+Facet counts live in a summary table with one row per (entity, facet,
+value). Writes adjust the affected rows by +1/-1 as venues and artists
+change, so rendering the facets reads a few dozen rows instead of
+grouping the whole table.
+"""
+
+from collections import Counter
+
+from sqlalchemy import and_, cast, exists, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import array, insert
+
+from data import genres, states
+
+FACET_VALUES = {
+    "genre": [value for value, _ in genres],
+    "state": [value for value, _ in states],
+}
+
+
+def facet_values(entity_genres, state):
+    values = [("genre", genre) for genre in set(entity_genres or [])]
+    if state:
+        values.append(("state", state))
+    return values
+
+
+def count_changes(old=(None, None), new=(None, None)):
+    """Returns the per (facet, value) deltas for a (genres, state) change."""
+    changes = Counter(facet_values(*new))
+    changes.subtract(Counter(facet_values(*old)))
+    return {key: delta for key, delta in changes.items() if delta}
+
+
+def apply_changes(connection, table, entity, changes):
+    # one upsert per row, so concurrent writers adding the first venue or
+    # artist with a value both land on the same row instead of racing to insert
+    for (facet, value), delta in changes.items():
+        row = dict(entity=entity, facet=facet, value=value, count=delta)
+        if connection.dialect.name == "sqlite":
+            connection.execute(
+                text(
+                    f'INSERT INTO "{table.name}" (entity, facet, value, count) '
+                    "VALUES (:entity, :facet, :value, :count) "
+                    "ON CONFLICT (entity, facet, value) "
+                    "DO UPDATE SET count = count + excluded.count"
+                ),
+                row,
+            )
+        else:
+            connection.execute(
+                insert(table)
+                .values(**row)
+                .on_conflict_do_update(
+                    index_elements=[table.c.entity, table.c.facet, table.c.value],
+                    set_={"count": table.c.count + delta},
+                )
+            )
+
+
+def get_facets(session, table, entity):
+    """Returns {facet: [{"value", "count"}]} in the order of the form choices."""
+    rows = session.execute(
+        table.select().where(and_(table.c.entity == entity, table.c.count > 0))
+    )
+    counts = {(row.facet, row.value): row.count for row in rows}
+    return {
+        facet: [
+            {"value": value, "count": counts[(facet, value)]}
+            for value in values
+            if (facet, value) in counts
+        ]
+        for facet, values in FACET_VALUES.items()
+    }
+
+
+def filter_criteria(session, model, genre=None, state=None):
+    criteria = []
+    if genre and session.bind.dialect.name == "sqlite":
+        # genres is a JSON array on SQLite
+        genre_values = select([literal_column("1")]).select_from(
+            func.json_each(model.genres)
+        )
+        criteria.append(exists(genre_values.where(literal_column("value") == genre)))
+    elif genre:
+        # genres @> ARRAY[genre] can use the GIN index on the genres column
+        criteria.append(model.genres.op("@>")(cast(array([genre]), model.genres.type)))
+    if state:
+        criteria.append(model.state == state)
+    return criteria
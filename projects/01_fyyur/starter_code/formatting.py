@@ -0,0 +1,48 @@
+"""The ``datetime`` Jinja filter.
+
+Show lists format the same handful of start times over and over, so the
+filter compiles each babel pattern and locale once, parses ISO strings
+without dateutil, and memoizes recent value/format results.
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+FORMATS = {
+    "full": "EEEE MMMM, d, y 'at' h:mma",
+    "medium": "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(format):
+    return babel.dates.parse_pattern(FORMATS.get(format, format))
+
+
+@lru_cache(maxsize=None)
+def get_locale(locale):
+    return Locale.parse(locale or babel.dates.LC_TIME)
+
+
+def parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+@lru_cache(maxsize=4096)
+def format_datetime(value, format="medium", locale=None):
+    date = parse_datetime(value)
+    if date.tzinfo is None:
+        # babel treats naive datetimes as UTC
+        date = date.replace(tzinfo=timezone.utc)
+    if format in ("short", "long"):
+        return babel.dates.format_datetime(date, format, locale=get_locale(locale))
+    return compile_pattern(format).apply(date, get_locale(locale))
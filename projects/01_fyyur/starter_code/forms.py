@@ -1,15 +1,20 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from data import genres, states
 from flask_wtf import Form
 from wtforms import (
     DateTimeField,
+    IntegerField,
     SelectField,
     SelectMultipleField,
     StringField,
     ValidationError,
 )
-from wtforms.validators import URL, AnyOf, DataRequired
+from wtforms.validators import URL, AnyOf, DataRequired, NumberRange
+
+# Show lengths in minutes. The cap also bounds the booking conflict queries.
+DEFAULT_SHOW_MINUTES = 120
+MAX_SHOW_DURATION = timedelta(hours=24)
 
 
 def validate_link(form, field):
@@ -20,6 +25,9 @@ def validate_link(form, field):
 
 
 class IsFuture:
+    # applies to shows booked through the form; bulk imports carry past shows
+    form_only = True
+
     def __call__(self, form, field):
         if field.data < datetime.today():
             raise ValidationError("Future has to be in the future")
@@ -31,6 +39,14 @@ class ShowForm(Form):
     start_time = DateTimeField(
         "start_time", validators=[DataRequired(), IsFuture()], default=datetime.today()
     )
+    duration = IntegerField(
+        "duration",
+        validators=[
+            DataRequired(),
+            NumberRange(min=1, max=MAX_SHOW_DURATION // timedelta(minutes=1)),
+        ],
+        default=DEFAULT_SHOW_MINUTES,
+    )
 
 
 class GeneralForm(Form):
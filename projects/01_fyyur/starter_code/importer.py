@@ -0,0 +1,134 @@
+"""Bulk loading helpers for ``flask fyyur import``.
+
+Files are read as CSV or NDJSON in the layout written by the /export
+endpoints, validated with the same forms the create pages use, and
+written in batches with ``bulk_insert_mappings`` or, on Postgres,
+``COPY ... FROM STDIN``. Rows keep the ids they were exported with, so
+shows exported alongside their venues and artists still reference them
+after the venues, artists and then shows files are imported in turn.
+"""
+
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+
+import formatting
+from export import LIST_SEPARATOR
+
+LIST_FIELDS = {"genres"}
+BOOLEAN_FIELDS = {"seeking_talent", "seeking_venue"}
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+
+def detect_format(path):
+    return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson"
+
+
+class InvalidRow:
+    """Stands in for a line that doesn't parse as a row."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def read_rows(path, format=None):
+    """Yields (line number, row dict) pairs with list and boolean cells
+    parsed, or an InvalidRow for a line that isn't a JSON object."""
+    format = format or detect_format(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if format == "csv":
+            for line, row in enumerate(csv.DictReader(f), 2):
+                yield line, parse_csv_row(row)
+        else:
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    yield line, parse_json_row(text)
+
+
+def parse_json_row(text):
+    try:
+        row = json.loads(text)
+    except ValueError as error:
+        return InvalidRow(f"Not valid JSON: {error}")
+    if not isinstance(row, dict):
+        return InvalidRow("Not a JSON object")
+    return row
+
+
+def parse_csv_row(row):
+    parsed = {}
+    for name, value in row.items():
+        if name in LIST_FIELDS:
+            value = [v for v in value.split(LIST_SEPARATOR) if v] if value else []
+        elif name in BOOLEAN_FIELDS:
+            value = value.strip().lower() in TRUE_VALUES if value else None
+        elif value == "":
+            value = None
+        parsed[name] = value
+    return parsed
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate(form_class, row):
+    """Returns the form errors for row, validated like a form submission
+    except for the validators marked form_only."""
+    if row.get("start_time"):
+        # DateTimeField expects its own format rather than the exported ISO one
+        start_time = formatting.parse_datetime(row["start_time"])
+        row = dict(row, start_time=start_time.strftime("%Y-%m-%d %H:%M:%S"))
+    formdata = MultiDict()
+    for name, value in row.items():
+        if isinstance(value, list):
+            formdata.setlist(name, value)
+        elif value is not None:
+            formdata[name] = str(value)
+    form = form_class(formdata=formdata, meta={"csrf": False})
+    for field in form:
+        # rules about new submissions, such as IsFuture, don't apply to loads
+        field.validators = [
+            v for v in field.validators if not getattr(v, "form_only", False)
+        ]
+    form.validate()
+    errors = dict(form.errors)
+    if row.get("id") is not None and not str(row["id"]).isdigit():
+        errors["id"] = ["Not a valid ID"]
+    return errors
+
+
+def copy_rows(connection, table, columns, mappings):
+    """Writes mappings with Postgres COPY, much faster than INSERTs."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for mapping in mappings:
+        writer.writerow([to_copy_value(mapping.get(column)) for column in columns])
+    buffer.seek(0)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def to_copy_value(value):
+    if isinstance(value, list):
+        quoted = (v.replace("\\", "\\\\").replace('"', '\\"') for v in value)
+        return "{" + ",".join(f'"{v}"' for v in quoted) + "}"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
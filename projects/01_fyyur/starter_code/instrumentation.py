@@ -0,0 +1,157 @@
+"""Per-request SQL instrumentation.
+
+Engine events time every statement a request runs. Each response gets a
+Server-Timing header with the query count and database time, statements
+that repeat within one request (the N+1 pattern) are logged, and
+per-endpoint histograms are served at /metrics in the Prometheus text
+format. Histograms are kept per process.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METRICS = {
+    "fyyur_request_duration_seconds": ("Request duration.", DURATION_BUCKETS),
+    "fyyur_request_db_seconds": ("Time spent in SQL per request.", DURATION_BUCKETS),
+    "fyyur_request_queries": ("SQL statements per request.", QUERY_BUCKETS),
+}
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.slowest = []
+
+    def record(self, statement, duration, keep):
+        self.query_count += 1
+        self.db_time += duration
+        self.statements[" ".join(statement.split())] += 1
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[keep:]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, endpoint):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{endpoint="{endpoint}"}} {self.sum}'
+        yield f'{name}_count{{endpoint="{endpoint}"}} {cumulative}'
+
+
+class SQLInstrumentation:
+    def __init__(self, app=None):
+        self._histograms = defaultdict(dict)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SQL_SLOW_STATEMENTS", 5)
+        app.config.setdefault("SQL_REPEAT_THRESHOLD", 5)
+        self.app = app
+        event.listen(Engine, "before_cursor_execute", self._before_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        # kept on the execution context, which a failed statement discards;
+        # the dialect's own setup queries run without one and go untimed
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        stats = g.get("sql_stats") if has_app_context() else None
+        if stats is not None:
+            stats.record(statement, duration, self.app.config["SQL_SLOW_STATEMENTS"])
+
+    def _before_request(self):
+        g.sql_stats = RequestStats()
+
+    def _after_request(self, response):
+        stats = g.pop("sql_stats", None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "unknown"
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries", '
+            f"app;dur={duration * 1000:.1f}",
+        )
+        self._report(endpoint, stats)
+        with self._lock:
+            histograms = self._histograms[endpoint]
+            for name, value in (
+                ("fyyur_request_duration_seconds", duration),
+                ("fyyur_request_db_seconds", stats.db_time),
+                ("fyyur_request_queries", stats.query_count),
+            ):
+                if name not in histograms:
+                    histograms[name] = Histogram(METRICS[name][1])
+                histograms[name].observe(value)
+        return response
+
+    def _report(self, endpoint, stats):
+        logger = self.app.logger
+        threshold = self.app.config["SQL_REPEAT_THRESHOLD"]
+        for statement, count in stats.statements.items():
+            if count >= threshold:
+                logger.warning(
+                    "%s ran the same statement %d times, likely an N+1 query: %s",
+                    endpoint,
+                    count,
+                    statement,
+                )
+        if stats.slowest and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s ran %d statements in %.1fms; slowest: %s",
+                endpoint,
+                stats.query_count,
+                stats.db_time * 1000,
+                "; ".join(
+                    f"{duration * 1000:.1f}ms {' '.join(statement.split())}"
+                    for duration, statement in stats.slowest
+                ),
+            )
+
+    def metrics(self):
+        lines = []
+        with self._lock:
+            for name, (help, _) in METRICS.items():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} histogram")
+                for endpoint, histograms in sorted(self._histograms.items()):
+                    if name in histograms:
+                        lines.extend(histograms[name].lines(name, endpoint))
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,160 @@
+"""Non-blocking application logging.
+
+Request threads only put records on a queue. A QueueListener thread
+writes them to a rotating log file, so a slow disk never holds up a
+request. Records carry the request id (taken from X-Request-ID or
+generated) and, for the per-request access record, the status and
+latency, and can be written as text or as one JSON object per line.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+
+from flask import g, has_request_context, request
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
+CONTEXT_FIELDS = ("request_id", "method", "path", "status", "duration_ms")
+
+
+class RequestContextFilter(logging.Filter):
+    # runs in the request thread, before the record leaves for the queue
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id")
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            if getattr(record, field, None) is not None:
+                entry[field] = getattr(record, field)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Drops records, counting them, rather than block when the queue is full."""
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # renders the message and traceback now, while args and exc_info are
+        # still valid, but leaves the formatting to the file handler
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_file_handler(config):
+    if config.get("LOG_ROTATE_WHEN"):
+        handler = TimedRotatingFileHandler(
+            config["LOG_FILE"],
+            when=config["LOG_ROTATE_WHEN"],
+            backupCount=config["LOG_BACKUP_COUNT"],
+            utc=True,
+        )
+    else:
+        handler = RotatingFileHandler(
+            config["LOG_FILE"],
+            maxBytes=config["LOG_MAX_BYTES"],
+            backupCount=config["LOG_BACKUP_COUNT"],
+        )
+    if config.get("LOG_FORMAT") == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+class QueuedLogging:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault("LOG_FILE", "error.log")
+        config.setdefault("LOG_FORMAT", "text")
+        config.setdefault("LOG_LEVEL", "INFO")
+        config.setdefault("LOG_MAX_BYTES", 10 * 1024 * 1024)
+        config.setdefault("LOG_ROTATE_WHEN", None)
+        config.setdefault("LOG_BACKUP_COUNT", 5)
+        config.setdefault("LOG_QUEUE_SIZE", 10000)
+        config.setdefault("LOG_REQUESTS", False)
+        self.app = app
+        self.handler = NonBlockingQueueHandler(queue.Queue(config["LOG_QUEUE_SIZE"]))
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = QueueListener(
+            self.handler.queue, create_file_handler(config), respect_handler_level=True
+        )
+        self.listener.start()
+        self._listening = True
+        atexit.register(self.close)
+        app.logger.setLevel(config["LOG_LEVEL"])
+        app.logger.addHandler(self.handler)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def close(self):
+        """Stops the listener once it has written everything still queued."""
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+
+    def _before_request(self):
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    def _after_request(self, response):
+        if "request_id" not in g:
+            return response
+        response.headers["X-Request-ID"] = g.request_id
+        if self.app.config["LOG_REQUESTS"]:
+            duration_ms = (time.perf_counter() - g.request_started) * 1000
+            self.app.logger.info(
+                "%s %s %s %.1fms",
+                request.method,
+                request.full_path.rstrip("?"),
+                response.status_code,
+                duration_ms,
+                extra={
+                    "status": response.status_code,
+                    "duration_ms": round(duration_ms, 1),
+                },
+            )
+        return response
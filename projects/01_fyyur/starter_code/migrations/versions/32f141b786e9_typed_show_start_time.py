@@ -0,0 +1,80 @@
+"""typed show start time
+
+Revision ID: 32f141b786e9
+Revises: 7347961ba8e5
+Create Date: 2026-10-17 09:48:05.530917
+
+"""
+
+from alembic import op
+import dateutil.parser
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "32f141b786e9"
+down_revision = "7347961ba8e5"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+shows = sa.table(
+    "Shows",
+    sa.column("id", sa.Integer),
+    sa.column("start_time", sa.String),
+    sa.column("start_at", sa.DateTime),
+)
+
+
+def backfill(convert, source, target):
+    # copies source into target one id range at a time to keep transactions short
+    bind = op.get_bind()
+    low, high = bind.execute(
+        sa.select([sa.func.min(shows.c.id), sa.func.max(shows.c.id)])
+    ).first()
+    if low is None:
+        return
+    for start in range(low, high + 1, BATCH_SIZE):
+        rows = bind.execute(
+            sa.select([shows.c.id, source]).where(
+                shows.c.id.between(start, start + BATCH_SIZE - 1)
+            )
+        ).fetchall()
+        if rows:
+            bind.execute(
+                shows.update()
+                .where(shows.c.id == sa.bindparam("show_id"))
+                .values({target.name: sa.bindparam("value")}),
+                [{"show_id": id, "value": convert(value)} for id, value in rows],
+            )
+
+
+def upgrade():
+    op.add_column("Shows", sa.Column("start_at", sa.DateTime(), nullable=True))
+    backfill(dateutil.parser.parse, shows.c.start_time, shows.c.start_at)
+    with op.batch_alter_table("Shows") as batch_op:
+        batch_op.drop_column("start_time")
+        batch_op.alter_column(
+            "start_at",
+            new_column_name="start_time",
+            existing_type=sa.DateTime(),
+            nullable=False,
+        )
+    op.create_index("ix_shows_venue_id_start_time", "Shows", ["venue_id", "start_time"])
+    op.create_index(
+        "ix_shows_artist_id_start_time", "Shows", ["artist_id", "start_time"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_shows_artist_id_start_time", table_name="Shows")
+    op.drop_index("ix_shows_venue_id_start_time", table_name="Shows")
+    with op.batch_alter_table("Shows") as batch_op:
+        batch_op.alter_column(
+            "start_time", new_column_name="start_at", existing_type=sa.DateTime()
+        )
+    op.add_column("Shows", sa.Column("start_time", sa.String(), nullable=True))
+    backfill(str, shows.c.start_at, shows.c.start_time)
+    with op.batch_alter_table("Shows") as batch_op:
+        batch_op.drop_column("start_at")
+        batch_op.alter_column("start_time", existing_type=sa.String(), nullable=False)
@@ -0,0 +1,135 @@
+"""search documents
+
+Revision ID: 4d35e5182a1e
+Revises: 32f141b786e9
+Create Date: 2026-10-17 11:20:37.402519
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4d35e5182a1e"
+down_revision = "32f141b786e9"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+TABLES = ["Venue", "Artist"]
+
+
+def backfill(name):
+    # fills search_document one id range at a time to keep transactions short
+    bind = op.get_bind()
+    entities = sa.table(
+        name,
+        sa.column("id", sa.Integer),
+        sa.column("name", sa.String),
+        sa.column("city", sa.String),
+        sa.column("state", sa.String),
+        sa.column("genres", sa.ARRAY(sa.String).with_variant(sa.JSON(), "sqlite")),
+        sa.column("search_document", sa.Text),
+    )
+    low, high = bind.execute(
+        sa.select([sa.func.min(entities.c.id), sa.func.max(entities.c.id)])
+    ).first()
+    if low is None:
+        return
+    for start in range(low, high + 1, BATCH_SIZE):
+        rows = bind.execute(
+            sa.select(
+                [
+                    entities.c.id,
+                    entities.c.name,
+                    entities.c.city,
+                    entities.c.state,
+                    entities.c.genres,
+                ]
+            ).where(entities.c.id.between(start, start + BATCH_SIZE - 1))
+        ).fetchall()
+        if rows:
+            bind.execute(
+                entities.update()
+                .where(entities.c.id == sa.bindparam("entity_id"))
+                .values(search_document=sa.bindparam("document")),
+                [
+                    {
+                        "entity_id": row.id,
+                        "document": " ".join(
+                            [row.name or "", row.city or "", row.state or ""]
+                            + list(row.genres or [])
+                        ),
+                    }
+                    for row in rows
+                ],
+            )
+
+
+def create_postgres_indexes(name):
+    op.create_index(
+        f"ix_{name.lower()}_search_document_fts",
+        name,
+        [sa.text("to_tsvector('simple', search_document)")],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        f"ix_{name.lower()}_search_document_trgm",
+        name,
+        ["search_document"],
+        postgresql_using="gin",
+        postgresql_ops={"search_document": "gin_trgm_ops"},
+    )
+
+
+def create_sqlite_fts(name):
+    fts = f"{name}_fts"
+    op.execute(
+        f'CREATE VIRTUAL TABLE "{fts}" USING fts5(search_document, '
+        f"content='{name}', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{name}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, search_document) '
+        f"VALUES (new.id, new.search_document); END"
+    )
+    op.execute(
+        f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{name}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, search_document) '
+        f"VALUES ('delete', old.id, old.search_document); END"
+    )
+    op.execute(
+        f'CREATE TRIGGER "{fts}_au" AFTER UPDATE ON "{name}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, search_document) '
+        f"VALUES ('delete', old.id, old.search_document); "
+        f'INSERT INTO "{fts}"(rowid, search_document) '
+        f"VALUES (new.id, new.search_document); END"
+    )
+    op.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name in TABLES:
+        op.add_column(name, sa.Column("search_document", sa.Text(), nullable=True))
+        backfill(name)
+        if dialect == "postgresql":
+            create_postgres_indexes(name)
+        elif dialect == "sqlite":
+            create_sqlite_fts(name)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for name in TABLES:
+        if dialect == "postgresql":
+            op.drop_index(f"ix_{name.lower()}_search_document_trgm", table_name=name)
+            op.drop_index(f"ix_{name.lower()}_search_document_fts", table_name=name)
+        elif dialect == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f'DROP TRIGGER "{name}_fts_{suffix}"')
+            op.execute(f'DROP TABLE "{name}_fts"')
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.drop_column("search_document")
@@ -0,0 +1,41 @@
+"""updated_at columns
+
+Revision ID: 5c8e2f7a9d41
+Revises: 76ae7daf1488
+Create Date: 2026-10-17 15:42:08.517334
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5c8e2f7a9d41"
+down_revision = "76ae7daf1488"
+branch_labels = None
+depends_on = None
+
+TABLES = ("Venue", "Artist", "Shows")
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for table in TABLES:
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE "{table}" SET updated_at = CURRENT_TIMESTAMP')
+        if postgres:
+            # covers rows written by COPY in 'flask fyyur import'; SQLite
+            # cannot alter the column in place, and the model sets it anyway
+            op.alter_column(
+                table,
+                "updated_at",
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            )
+
+
+def downgrade():
+    # a plain DROP COLUMN (SQLite 3.35+) rather than batch mode, whose table
+    # copy on SQLite would drop the search triggers on Venue and Artist
+    for table in reversed(TABLES):
+        op.drop_column(table, "updated_at")
@@ -0,0 +1,88 @@
+"""initial schema
+
+Revision ID: 7347961ba8e5
+Revises:
+Create Date: 2026-10-17 09:12:41.118202
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7347961ba8e5"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# a JSON array on SQLite, which has no ARRAY type
+GENRES = sa.ARRAY(sa.String(length=120)).with_variant(sa.JSON(), "sqlite")
+
+
+def upgrade():
+    # databases set up with db.create_all() before there were migrations
+    # already have these tables, so only the missing ones are created and the
+    # later revisions then convert the existing ones
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "Artist" not in existing:
+        create_artist()
+    if "Venue" not in existing:
+        create_venue()
+    if "Shows" not in existing:
+        create_shows()
+
+
+def create_artist():
+    op.create_table(
+        "Artist",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("city", sa.String(length=120), nullable=False),
+        sa.Column("state", sa.String(length=120), nullable=False),
+        sa.Column("phone", sa.String(length=120), nullable=False),
+        sa.Column("genres", GENRES, nullable=True),
+        sa.Column("website", sa.String(length=500), nullable=True),
+        sa.Column("image_link", sa.String(length=500), nullable=True),
+        sa.Column("facebook_link", sa.String(length=120), nullable=True),
+        sa.Column("seeking_venue", sa.Boolean(), nullable=True),
+        sa.Column("seeking_description", sa.String(length=500), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def create_venue():
+    op.create_table(
+        "Venue",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("city", sa.String(length=120), nullable=False),
+        sa.Column("state", sa.String(length=120), nullable=False),
+        sa.Column("address", sa.String(length=120), nullable=False),
+        sa.Column("genres", GENRES, nullable=True),
+        sa.Column("phone", sa.String(length=120), nullable=False),
+        sa.Column("website", sa.String(length=500), nullable=True),
+        sa.Column("image_link", sa.String(length=500), nullable=True),
+        sa.Column("facebook_link", sa.String(length=120), nullable=True),
+        sa.Column("seeking_talent", sa.Boolean(), nullable=True),
+        sa.Column("seeking_description", sa.String(length=500), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def create_shows():
+    op.create_table(
+        "Shows",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.String(), nullable=False),
+        sa.Column("venue_id", sa.Integer(), nullable=False),
+        sa.Column("artist_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["artist_id"], ["Artist.id"]),
+        sa.ForeignKeyConstraint(["venue_id"], ["Venue.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("Shows")
+    op.drop_table("Venue")
+    op.drop_table("Artist")
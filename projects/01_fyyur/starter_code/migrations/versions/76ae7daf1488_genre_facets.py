@@ -0,0 +1,79 @@
+"""genre facets
+
+Revision ID: 76ae7daf1488
+Revises: b09c67fb31b5
+Create Date: 2026-10-17 14:31:52.203668
+
+"""
+
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "76ae7daf1488"
+down_revision = "b09c67fb31b5"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+TABLES = ["Venue", "Artist"]
+
+
+def count_facets(name):
+    # counts genres and states one id range at a time
+    bind = op.get_bind()
+    entities = sa.table(
+        name,
+        sa.column("id", sa.Integer),
+        sa.column("state", sa.String),
+        sa.column("genres", sa.ARRAY(sa.String).with_variant(sa.JSON(), "sqlite")),
+    )
+    counts = Counter()
+    low, high = bind.execute(
+        sa.select([sa.func.min(entities.c.id), sa.func.max(entities.c.id)])
+    ).first()
+    if low is None:
+        return counts
+    for start in range(low, high + 1, BATCH_SIZE):
+        rows = bind.execute(
+            sa.select([entities.c.state, entities.c.genres]).where(
+                entities.c.id.between(start, start + BATCH_SIZE - 1)
+            )
+        )
+        for state, genres in rows:
+            counts.update(("genre", genre) for genre in set(genres or []))
+            if state:
+                counts[("state", state)] += 1
+    return counts
+
+
+def upgrade():
+    facet_counts = op.create_table(
+        "FacetCounts",
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("facet", sa.String(length=20), nullable=False),
+        sa.Column("value", sa.String(length=120), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("entity", "facet", "value"),
+    )
+    for name in TABLES:
+        rows = [
+            {"entity": name.lower(), "facet": facet, "value": value, "count": count}
+            for (facet, value), count in count_facets(name).items()
+        ]
+        if rows:
+            op.bulk_insert(facet_counts, rows)
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index("ix_venue_genres", "Venue", ["genres"], postgresql_using="gin")
+        op.create_index(
+            "ix_artist_genres", "Artist", ["genres"], postgresql_using="gin"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_artist_genres", table_name="Artist")
+        op.drop_index("ix_venue_genres", table_name="Venue")
+    op.drop_table("FacetCounts")
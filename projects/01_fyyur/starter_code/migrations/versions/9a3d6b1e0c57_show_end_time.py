@@ -0,0 +1,100 @@
+"""show end time
+
+Revision ID: 9a3d6b1e0c57
+Revises: 5c8e2f7a9d41
+Create Date: 2026-10-17 16:21:37.204918
+
+"""
+
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9a3d6b1e0c57"
+down_revision = "5c8e2f7a9d41"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+DEFAULT_DURATION = timedelta(minutes=120)
+EXCLUSIONS = {
+    "ex_shows_venue_overlap": "venue_id",
+    "ex_shows_artist_overlap": "artist_id",
+}
+
+shows = sa.table(
+    "Shows",
+    sa.column("id", sa.Integer),
+    sa.column("venue_id", sa.Integer),
+    sa.column("artist_id", sa.Integer),
+    sa.column("start_time", sa.DateTime),
+    sa.column("end_time", sa.DateTime),
+)
+
+
+def backfill():
+    # gives existing shows the default duration, cut short where the next show
+    # at the same venue or by the same artist starts, so they never overlap.
+    # Walks the shows latest first in keyset batches on (start_time, id), and
+    # keeps only the next start of each venue and artist in memory.
+    bind = op.get_bind()
+    query = (
+        sa.select([shows.c.id, shows.c.venue_id, shows.c.artist_id, shows.c.start_time])
+        .order_by(shows.c.start_time.desc(), shows.c.id.desc())
+        .limit(BATCH_SIZE)
+    )
+    next_start = {}
+    rows = bind.execute(query).fetchall()
+    while rows:
+        updates = []
+        for id, venue_id, artist_id, start_time in rows:
+            end_time = min(
+                start_time + DEFAULT_DURATION,
+                next_start.get(("venue", venue_id), start_time + DEFAULT_DURATION),
+                next_start.get(("artist", artist_id), start_time + DEFAULT_DURATION),
+            )
+            next_start["venue", venue_id] = start_time
+            next_start["artist", artist_id] = start_time
+            updates.append({"show_id": id, "end_time": end_time})
+        bind.execute(
+            shows.update()
+            .where(shows.c.id == sa.bindparam("show_id"))
+            .values(end_time=sa.bindparam("end_time")),
+            updates,
+        )
+        last_id, last_start = rows[-1].id, rows[-1].start_time
+        rows = bind.execute(
+            query.where(
+                sa.or_(
+                    shows.c.start_time < last_start,
+                    sa.and_(shows.c.start_time == last_start, shows.c.id < last_id),
+                )
+            )
+        ).fetchall()
+
+
+def upgrade():
+    op.add_column("Shows", sa.Column("end_time", sa.DateTime(), nullable=True))
+    backfill()
+    with op.batch_alter_table("Shows") as batch_op:
+        batch_op.alter_column("end_time", existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint("ck_shows_end_time", "end_time >= start_time")
+    if op.get_bind().dialect.name == "postgresql":
+        # SQLite relies on the (venue_id|artist_id, start_time) indexes instead
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        for name, column in EXCLUSIONS.items():
+            op.execute(
+                f'ALTER TABLE "Shows" ADD CONSTRAINT {name} EXCLUDE USING gist '
+                f"({column} WITH =, tsrange(start_time, end_time) WITH &&)"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for name in EXCLUSIONS:
+            op.drop_constraint(name, "Shows")
+    with op.batch_alter_table("Shows") as batch_op:
+        batch_op.drop_constraint("ck_shows_end_time", type_="check")
+        batch_op.drop_column("end_time")
@@ -0,0 +1,28 @@
+"""listing keyset indexes
+
+Revision ID: b09c67fb31b5
+Revises: 4d35e5182a1e
+Create Date: 2026-10-17 13:05:12.845310
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b09c67fb31b5"
+down_revision = "4d35e5182a1e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_venue_area", "Venue", ["state", "city", "name", "id"])
+    op.create_index("ix_artist_name_id", "Artist", ["name", "id"])
+    op.create_index("ix_shows_start_time_id", "Shows", ["start_time", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_shows_start_time_id", table_name="Shows")
+    op.drop_index("ix_artist_name_id", table_name="Artist")
+    op.drop_index("ix_venue_area", table_name="Venue")
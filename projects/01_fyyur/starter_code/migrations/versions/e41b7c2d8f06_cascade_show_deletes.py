@@ -0,0 +1,39 @@
+"""cascade show deletes
+
+Revision ID: e41b7c2d8f06
+Revises: 9a3d6b1e0c57
+Create Date: 2026-10-17 17:03:55.381027
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e41b7c2d8f06"
+down_revision = "9a3d6b1e0c57"
+branch_labels = None
+depends_on = None
+
+# matches the names Postgres gave the initial, unnamed foreign keys, and
+# names the reflected ones on SQLite so that batch mode can drop them
+NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+FOREIGN_KEYS = {"venue_id": "Venue", "artist_id": "Artist"}
+
+
+def replace_foreign_keys(ondelete):
+    with op.batch_alter_table("Shows", naming_convention=NAMING_CONVENTION) as batch_op:
+        for column, parent in FOREIGN_KEYS.items():
+            name = f"Shows_{column}_fkey"
+            batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(
+                name, parent, [column], ["id"], ondelete=ondelete
+            )
+
+
+def upgrade():
+    replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    replace_foreign_keys(None)
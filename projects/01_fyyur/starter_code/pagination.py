@@ -0,0 +1,74 @@
+"""Keyset (cursor) pagination for listing pages.
+
+Instead of an OFFSET, each page remembers the sort key of its first and
+last rows and the next query seeks past it with a row comparison. With an
+index on the sort columns a page costs the same whatever the table size.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import DateTime, tuple_
+
+Page = namedtuple("Page", ["items", "next_cursor", "prev_cursor"])
+
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, columns):
+    """Raises ValueError for cursors that were not produced by encode_cursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Invalid cursor {cursor!r}") from error
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return [decode_value(column, value) for column, value in zip(columns, values)]
+
+
+def decode_value(column, value):
+    # cursors come from the client, so each value must have the column's type
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError(f"Invalid cursor value {value!r}")
+        return datetime.fromisoformat(value)
+    expected = column.type.python_type
+    if not isinstance(value, expected) or isinstance(value, bool) != (expected is bool):
+        raise ValueError(f"Invalid cursor value {value!r}")
+    return value
+
+
+def keyset_page(query, columns, after=None, before=None, per_page=50):
+    """Returns the page of query rows sorted by columns after or before a cursor.
+
+    columns must end with a unique column (usually the primary key) so the
+    ordering is total and no row is skipped or repeated between pages.
+    """
+    key = tuple_(*columns)
+    labels = [column.label(f"cursor_{i}") for i, column in enumerate(columns)]
+    query = query.add_columns(*labels).order_by(None)
+    if before is not None:
+        query = query.filter(key < tuple_(*decode_cursor(before, columns)))
+        rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+        has_prev, has_next = len(rows) > per_page, True
+        items = rows[:per_page][::-1]
+    else:
+        if after is not None:
+            query = query.filter(key > tuple_(*decode_cursor(after, columns)))
+        rows = query.order_by(*columns).limit(per_page + 1).all()
+        has_prev, has_next = after is not None, len(rows) > per_page
+        items = rows[:per_page]
+
+    def cursor(row):
+        return encode_cursor([getattr(row, label.name) for label in labels])
+
+    return Page(
+        items=items,
+        next_cursor=cursor(items[-1]) if items and has_next else None,
+        prev_cursor=cursor(items[0]) if items and has_prev else None,
+    )
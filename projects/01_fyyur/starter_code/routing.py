@@ -0,0 +1,159 @@
+"""Primary/replica database routing and connection pool profiles.
+
+Views marked with ``read_only`` run their queries on a read replica picked
+round-robin from SQLALCHEMY_REPLICA_URIS. Everything else, and any flush,
+stays on the primary. A replica that fails its health check is skipped
+until the next check, and reads fall back to the primary when no replica
+is healthy or a replica query fails.
+
+Replicas lag behind the primary, so a client that just committed a write
+keeps reading from the primary for REPLICA_STICKY_SECONDS and sees its
+own changes on the page it is redirected to.
+"""
+
+import itertools
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle")
+
+
+def engine_options(url, pool):
+    """Translates a pool profile from config.py into create_engine options."""
+    options = {"pool_pre_ping": pool.get("pool_pre_ping", False)}
+    if url.get_backend_name() == "sqlite":
+        # SQLite picks its own pool class and has no statement timeout
+        return options
+    options.update((key, pool[key]) for key in POOL_OPTIONS if key in pool)
+    postgres = url.get_backend_name() in ("postgresql", "postgres")
+    if postgres and pool.get("statement_timeout_ms"):
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={pool['statement_timeout_ms']}"
+        }
+    return options
+
+
+class ReplicaSet:
+    def __init__(self, uris, pool, health_interval=30):
+        self.engines = [
+            create_engine(uri, **engine_options(make_url(uri), pool)) for uri in uris
+        ]
+        self.health_interval = health_interval
+        self._order = itertools.cycle(range(len(self.engines)))
+        self._health = {}
+        self._lock = threading.Lock()
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._handle_error)
+
+    def choose(self):
+        """Returns the next healthy replica engine, or None if there is none."""
+        for _ in self.engines:
+            with self._lock:
+                index = next(self._order)
+            if self.is_healthy(index):
+                return self.engines[index]
+        return None
+
+    def is_healthy(self, index):
+        checked_at, healthy = self._health.get(index, (None, True))
+        if checked_at is None or time.monotonic() - checked_at >= self.health_interval:
+            healthy = self._check(self.engines[index])
+            self._health[index] = (time.monotonic(), healthy)
+        return healthy
+
+    def _check(self, engine):
+        try:
+            with engine.connect() as connection:
+                connection.scalar("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def _handle_error(self, context):
+        if context.is_disconnect:
+            index = self.engines.index(context.engine)
+            self._health[index] = (time.monotonic(), False)
+
+
+def pinned_to_primary():
+    return session.get("primary_until", 0) > time.time()
+
+
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_request_context() and g.get("read_only"):
+            if "replica" not in g:
+                replicas = self.app.extensions.get("replicas")
+                use_replica = replicas and not pinned_to_primary()
+                g.replica = replicas.choose() if use_replica else None
+            if g.replica is not None:
+                return g.replica
+        return super().get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_to_primary(db_session):
+    # the client's next reads go to the primary until the replicas catch up
+    if has_request_context() and db_session.app.extensions.get("replicas"):
+        sticky = db_session.app.config.get("REPLICA_STICKY_SECONDS", 5)
+        session["primary_until"] = time.time() + sticky
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def init_app(self, app):
+        super().init_app(app)
+        uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+        app.extensions["replicas"] = (
+            ReplicaSet(
+                uris,
+                app.config.get("REPLICA_POOL", {}),
+                app.config.get("REPLICA_HEALTH_INTERVAL", 30),
+            )
+            if uris
+            else None
+        )
+
+    def create_session(self, options):
+        return sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        options.update(engine_options(sa_url, app.config.get("DATABASE_POOL", {})))
+        return sa_url, options
+
+
+def read_only(view):
+    """Sends the queries of a view that never writes to a read replica, and
+    runs the view again on the primary if a replica query fails."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        try:
+            return view(*args, **kwargs)
+        except DBAPIError:
+            if g.get("replica") is None:
+                raise
+            current_app.logger.warning(
+                "Query on replica %r failed, retrying on the primary",
+                g.replica.url,
+                exc_info=True,
+            )
+            current_app.extensions["sqlalchemy"].db.session.rollback()
+            g.replica = None
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def used_replica():
+    """Whether the current request read from a replica."""
+    return g.get("replica") is not None
@@ -0,0 +1,74 @@
+"""Ranked venue and artist search.
+
+Every searchable model keeps a ``search_document`` column with its name,
+city, state and genres. On Postgres it is backed by a GIN full-text index
+and a GIN trigram index, so both word matches and partial matches are
+index scans. On SQLite an FTS5 trigram table mirrors the column instead.
+"""
+
+from sqlalchemy import column, func, literal_column, or_, table
+
+
+def build_document(name, city, state, genres):
+    return " ".join([name or "", city or "", state or ""] + list(genres or []))
+
+
+def escape_like(term):
+    return term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def search(session, model, term, page=1, per_page=20):
+    """Returns one page of (id, name) rows and the total number of matches.
+
+    The total comes from a window count over the same query, so the page
+    and the count cost a single round trip. A page past the last match has
+    no row to carry it, and counts separately.
+    """
+    term = term.strip()
+    total = func.count().over().label("total")
+    query = session.query(model.id, model.name, total)
+    if term:
+        if session.bind.dialect.name == "sqlite":
+            query = _filter_sqlite(query, model, term)
+        else:
+            query = _filter_postgres(query, model, term)
+    rows = (
+        query.order_by(model.name, model.id)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+        .all()
+    )
+    if rows:
+        return rows, rows[0].total
+    if page > 1:
+        count = query.order_by(None).with_entities(func.count(model.id))
+        return rows, count.scalar()
+    return rows, 0
+
+
+def _filter_postgres(query, model, term):
+    document = func.to_tsvector(literal_column("'simple'"), model.search_document)
+    tsquery = func.plainto_tsquery(literal_column("'simple'"), term)
+    rank = func.ts_rank(document, tsquery) + func.similarity(model.name, term)
+    return query.filter(
+        or_(
+            document.op("@@")(tsquery),
+            model.search_document.ilike(f"%{escape_like(term)}%", escape="!"),
+        )
+    ).order_by(rank.desc())
+
+
+def _filter_sqlite(query, model, term):
+    fts = table(
+        f"{model.__tablename__}_fts", column("rowid"), column("search_document")
+    )
+    query = query.join(fts, fts.c.rowid == model.id)
+    if len(term) < 3:
+        # the trigram tokenizer can only match terms of three or more characters
+        return query.filter(
+            fts.c.search_document.ilike(f"%{escape_like(term)}%", escape="!")
+        )
+    phrase = '"{}"'.format(term.replace('"', '""'))
+    return query.filter(fts.c.search_document.op("MATCH")(phrase)).order_by(
+        literal_column(f'"{fts.name}".rank')
+    )
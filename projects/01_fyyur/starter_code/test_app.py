@@ -0,0 +1,307 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+workdir = tempfile.mkdtemp()
+primary = os.path.join(workdir, "fyyur.db")
+replica = os.path.join(workdir, "replica.db")
+os.environ["FYYUR_DATABASE_URI"] = f"sqlite:///{primary}"
+# a copy of the primary that is only brought up to date by sync_replica
+os.environ["FYYUR_REPLICA_URIS"] = f"sqlite:///{replica}"
+
+from flask_migrate import upgrade
+
+import autocomplete
+import facets
+from app import (
+    app,
+    db,
+    export_columns,
+    page_cache,
+    page_key,
+    related_page_ids,
+    search_results,
+    Artist,
+    FacetCount,
+    Show,
+    Venue,
+)
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+app.config["WTF_CSRF_ENABLED"] = False
+
+
+def replica_engines():
+    return app.extensions["replicas"].engines
+
+
+def create_database():
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+        if os.path.exists(primary):
+            os.remove(primary)
+        upgrade(MIGRATIONS)
+
+
+def sync_replica():
+    for engine in replica_engines():
+        engine.dispose()
+    shutil.copyfile(primary, replica)
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents the fyyur test case"""
+
+    def setUp(self):
+        self.client = app.test_client
+        create_database()
+        self.seed()
+        sync_replica()
+        page_cache.delete_many(
+            *(page_key(kind, id) for kind in ("venue", "artist") for id in (1, 2))
+        )
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+
+    @classmethod
+    def tearDownClass(cls):
+        with app.app_context():
+            db.engine.dispose()
+        for engine in replica_engines():
+            engine.dispose()
+        shutil.rmtree(workdir)
+
+    def seed(self):
+        now = datetime.now().replace(microsecond=0)
+        with app.app_context():
+            for name in ("The Musical Hop", "Park Square Live Music & Coffee"):
+                db.session.add(
+                    Venue(
+                        name=name,
+                        city="San Francisco",
+                        state="CA",
+                        address="1015 Folsom Street",
+                        phone="123-123-1234",
+                        genres=["Jazz", "Folk"],
+                    )
+                )
+            for name in ("Guns N Petals", "Matt Quevedo"):
+                db.session.add(
+                    Artist(
+                        name=name,
+                        city="San Francisco",
+                        state="CA",
+                        phone="326-123-5000",
+                        genres=["Rock n Roll"],
+                    )
+                )
+            db.session.commit()
+            for days in (-30, -2, 5):
+                db.session.add(
+                    Show(
+                        venue_id=2,
+                        artist_id=1 if days < 0 else 2,
+                        start_time=now + timedelta(days=days),
+                        end_time=now + timedelta(days=days, hours=2),
+                    )
+                )
+            db.session.commit()
+
+    def snapshot(self):
+        # the exported columns of every row, by entity
+        with app.app_context():
+            return {
+                entity: [
+                    row._asdict()
+                    for row in db.session.query(*columns).order_by(columns[0])
+                ]
+                for entity, columns in export_columns().items()
+            }
+
+    def test_export_then_import_restores_rows_and_ids(self):
+        # drop the first venue so that ids no longer follow insertion order
+        with app.app_context():
+            db.session.delete(Venue.query.get(1))
+            db.session.commit()
+        sync_replica()
+        before = self.snapshot()
+
+        paths = {}
+        for entity in ("venues", "artists", "shows"):
+            res = self.client().get(f"/export/{entity}")
+            self.assertEqual(res.status_code, 200)
+            paths[entity] = os.path.join(workdir, f"{entity}.ndjson")
+            with open(paths[entity], "wb") as file:
+                file.write(res.data)
+
+        create_database()
+        runner = app.test_cli_runner()
+        for entity in ("venues", "artists", "shows"):
+            result = runner.invoke(args=["fyyur", "import", entity, paths[entity]])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("skipped 0 invalid rows", result.output)
+
+        after = self.snapshot()
+        self.assertEqual(after, before)
+        self.assertEqual([venue["id"] for venue in after["venues"]], [2])
+        self.assertEqual(len(after["shows"]), 3)
+
+    def test_import_skips_taken_ids(self):
+        res = self.client().get("/export/artists")
+        path = os.path.join(workdir, "artists.ndjson")
+        with open(path, "wb") as file:
+            file.write(res.data)
+
+        result = app.test_cli_runner().invoke(args=["fyyur", "import", "artists", path])
+        self.assertIn("ID 1 already exists", result.output)
+        self.assertEqual(len(self.snapshot()["artists"]), 2)
+
+    def test_import_skips_malformed_lines(self):
+        path = os.path.join(workdir, "artists.ndjson")
+        with open(path, "w") as file:
+            file.write('{"name": "The Wild Sax Band", "city": "San Francisco", ')
+            file.write('"state": "CA", "phone": "432-325-5432"}\n')
+            file.write('{"name": "Broken\n')
+            file.write("[1, 2]\n")
+            file.write('{"name": "Matt Quevedo", "city": "New York", ')
+            file.write('"state": "NY", "phone": "300-400-5000"}\n')
+
+        result = app.test_cli_runner().invoke(args=["fyyur", "import", "artists", path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(f"{path}:2: Not valid JSON", result.output)
+        self.assertIn(f"{path}:3: Not a JSON object", result.output)
+        self.assertIn("Imported 2 artists", result.output)
+        self.assertIn("skipped 2 invalid rows", result.output)
+        self.assertEqual(len(self.snapshot()["artists"]), 4)
+
+    def test_facet_counts_follow_writes(self):
+        with app.app_context():
+            venue = Venue.query.get(1)
+            venue.genres = ["Jazz", "Blues"]
+            db.session.commit()
+            venue_facets = facets.get_facets(db.session, FacetCount.__table__, "venue")
+        self.assertEqual(
+            venue_facets["genre"],
+            [
+                {"value": "Blues", "count": 1},
+                {"value": "Folk", "count": 1},
+                {"value": "Jazz", "count": 2},
+            ],
+        )
+        self.assertEqual(venue_facets["state"], [{"value": "CA", "count": 2}])
+
+    def test_read_after_write_uses_primary(self):
+        data = {
+            "name": "The Dueling Pianos Bar",
+            "city": "New York",
+            "state": "NY",
+            "address": "335 Delancey Street",
+            "phone": "914-003-1132",
+            "genres": ["Classical"],
+        }
+        res = self.client().post("/venues/1/edit", data=data, follow_redirects=True)
+        self.assertEqual(res.status_code, 200)
+        # the flashed message names the venue too, so look for the old name
+        self.assertNotIn(b"The Musical Hop", res.data)
+
+    def test_pages_read_from_replica_are_not_cached(self):
+        with app.app_context():
+            Venue.query.get(1).name = "The Dueling Pianos Bar"
+            db.session.commit()
+        # another client, while the replica still lags
+        res = self.client().get("/venues/1")
+        self.assertIn(b"The Musical Hop", res.data)
+
+        sync_replica()
+        res = self.client().get("/venues/1")
+        self.assertIn(b"The Dueling Pianos Bar", res.data)
+
+    def test_failed_replica_query_is_retried_on_primary(self):
+        for engine in replica_engines():
+            engine.dispose()
+        # a replica that answers but has no tables
+        os.remove(replica)
+        res = self.client().get("/venues/1")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"The Musical Hop", res.data)
+
+    def test_detail_page_not_modified(self):
+        res = self.client().get("/artists/1")
+        etag = res.headers["ETag"]
+        self.assertIsNone(res.headers.get("Last-Modified"))
+
+        res = self.client().get("/artists/1", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+
+        # deleting a show leaves every updated_at as it was
+        with app.app_context():
+            db.session.delete(Show.query.filter_by(artist_id=1).first())
+            db.session.commit()
+        sync_replica()
+        res = self.client().get("/artists/1", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_related_page_ids(self):
+        with app.app_context():
+            self.assertEqual(
+                related_page_ids(venue_ids=[2]),
+                {"venue_ids": {2}, "artist_ids": {1, 2}},
+            )
+            self.assertEqual(
+                related_page_ids(artist_ids=[1]),
+                {"venue_ids": {2}, "artist_ids": {1}},
+            )
+
+    def search_page(self, page):
+        data = {"search_term": "San Francisco", "page": page}
+        with app.test_request_context("/venues/search", method="POST", data=data):
+            return search_results(Venue)
+
+    def test_search_paging(self):
+        per_page = app.config["SEARCH_PAGE_SIZE"]
+        app.config["SEARCH_PAGE_SIZE"] = 1
+        try:
+            first = self.search_page(1)
+            self.assertEqual((first["count"], len(first["data"])), (2, 1))
+            self.assertTrue(first["has_next"])
+
+            last = self.search_page(2)
+            self.assertEqual((last["count"], len(last["data"])), (2, 1))
+            self.assertFalse(last["has_next"])
+            self.assertNotEqual(last["data"], first["data"])
+
+            past = self.search_page(5)
+            self.assertEqual((past["count"], past["data"]), (2, []))
+            self.assertFalse(past["has_next"])
+
+            for page in (0, -3):
+                self.assertEqual(self.search_page(page), first)
+        finally:
+            app.config["SEARCH_PAGE_SIZE"] = per_page
+
+    def test_autocomplete_loads_in_background(self):
+        release = threading.Event()
+
+        def loader():
+            release.wait(5)
+            return [(1, "The Blue Note"), (2, "Park Square Live Music")]
+
+        index = autocomplete.PrefixIndex(loader)
+        # the first search doesn't wait for the load
+        self.assertEqual(index.search("note"), [])
+        release.set()
+        deadline = time.monotonic() + 5
+        while index.loaded_at is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(index.search("note"), [{"id": 1, "name": "The Blue Note"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
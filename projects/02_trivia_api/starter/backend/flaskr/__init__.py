@@ -1,40 +1,160 @@
+import hashlib
 import json
-import random
+from functools import wraps
 
-from flask import abort, Flask, jsonify, request
+from flask import abort, Flask, g, jsonify, make_response, request, Response
 from flask_cors import CORS
+from sqlalchemy import func
+from werkzeug.http import is_resource_modified
 
-from models import setup_db, Question, Category
-
+from models import db, database_path, setup_db, Question, Category
+from .categories import CategoryCache, json_response
+from .quizzes import MemoryDeckStore, SQLiteDeckStore
+from .search import search_questions
 
 QUESTIONS_PER_PAGE = 10
-
-
-def paginate_questions(request, selection):
-    page = request.args.get("page", 1, type=int)
-    start = (page - 1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
-
-    questions = [q.format() for q in selection]
-    return questions[start:end]
+QUESTION_FIELDS = {"question", "answer", "category", "difficulty"}
+BATCH_CHUNK = 1000
+
+
+def paginate_questions(request, query, total=None):
+    """Returns one page of the query's questions, in id order, and the total
+    number of questions it matches. Only the rows on the page are loaded.
+    ?after=<id> continues from the last id the client has seen instead of
+    skipping ?page pages, so deep pages cost the same as the first. Pass
+    total when it is already known to skip counting the matches."""
+    query = query.order_by(Question.id)
+    after = request.args.get("after", type=int)
+    if after is not None:
+        page_query = query.filter(Question.id > after)
+    else:
+        page = max(request.args.get("page", 1, type=int), 1)
+        page_query = query.offset((page - 1) * QUESTIONS_PER_PAGE)
+    questions = [q.format() for q in page_query.limit(QUESTIONS_PER_PAGE)]
+
+    if total is not None:
+        return questions, total
+    # a short first page already is the whole selection
+    if after is None and page == 1 and len(questions) < QUESTIONS_PER_PAGE:
+        return questions, len(questions)
+    return questions, query.order_by(None).count()
 
 
 def newDumbFunction(self, OHSHIT):
     return Flask.run()
 
 
-def format_categories(categories):
-    formatted_categories = [c.format() for c in categories]
-    formatted_categories = {c["id"]: c["type"] for c in formatted_categories}
-    return formatted_categories
+def get_version(selections):
+    """Returns the latest updated_at and the row count of each (model,
+    *criteria) selection, all in one query. The version of the current
+    request is kept in g.version, so views can reuse its counts."""
+    columns = []
+    for model, *criteria in selections:
+        for aggregate in (func.max(model.updated_at), func.count(model.id)):
+            columns.append(db.session.query(aggregate).filter(*criteria).as_scalar())
+    return db.session.query(*columns).one()
+
+
+def conditional(selections):
+    """Answers 304 Not Modified, before the view queries or serializes
+    anything, when the client already has the current response. selections
+    is called with the view arguments and names the rows the response is
+    built from."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            version = g.version = get_version(selections(**kwargs))
+            etag = hashlib.sha1(repr(tuple(version)).encode()).hexdigest()
+            # no Last-Modified: deletes change the counts but not max(updated_at)
+            if is_resource_modified(request.environ, etag):
+                response = make_response(view(**kwargs))
+            else:
+                response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def validate_question(data, category_ids):
+    """Returns why a question payload can't be inserted, or None if it can."""
+    if not isinstance(data, dict):
+        return "not an object"
+    missing = sorted(QUESTION_FIELDS - data.keys())
+    if missing:
+        return f"missing {', '.join(missing)}"
+    unknown = sorted(data.keys() - QUESTION_FIELDS)
+    if unknown:
+        return f"unknown {', '.join(unknown)}"
+    for field in ("question", "answer"):
+        if not isinstance(data[field], str) or not data[field].strip():
+            return f"{field} must be a non-empty string"
+    if not isinstance(data["difficulty"], int) or isinstance(data["difficulty"], bool):
+        return "difficulty must be an integer"
+    if str(data["category"]) not in category_ids:
+        return "unknown category"
+    return None
+
+
+def insert_questions(rows):
+    """Inserts the rows in batches of BATCH_CHUNK and returns their ids, in
+    order. Doesn't commit."""
+    table = Question.__table__
+    ids = []
+    for start in range(0, len(rows), BATCH_CHUNK):
+        chunk = rows[start : start + BATCH_CHUNK]
+        if db.engine.dialect.name == "postgresql":
+            # one multi-row INSERT, which returns the ids in VALUES order
+            result = db.session.execute(
+                table.insert().values(chunk).returning(table.c.id)
+            )
+            ids.extend(id for id, in result)
+        else:
+            db.session.bulk_insert_mappings(Question, chunk, return_defaults=True)
+            ids.extend(row["id"] for row in chunk)
+    return ids
+
+
+def delete_questions(ids):
+    """Deletes the questions with these ids, in batches of BATCH_CHUNK, and
+    returns the ids that existed. Doesn't commit."""
+    found = set()
+    for start in range(0, len(ids), BATCH_CHUNK):
+        chunk = db.session.query(Question.id).filter(
+            Question.id.in_(ids[start : start + BATCH_CHUNK])
+        )
+        existing = {id for id, in chunk}
+        Question.query.filter(Question.id.in_(existing)).delete(
+            synchronize_session=False
+        )
+        found |= existing
+    return found
 
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
-    setup_db(app)
+    app.config.from_mapping(
+        QUIZ_SESSIONS=1000, QUIZ_DECK_DATABASE=None, DATABASE_PATH=database_path
+    )
+    if test_config is not None:
+        app.config.from_mapping(test_config)
+    setup_db(app, app.config["DATABASE_PATH"])
 
     cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
+    category_cache = CategoryCache()
+    # decks live in this process unless QUIZ_DECK_DATABASE names a SQLite file
+    # that several worker processes can share
+    if app.config["QUIZ_DECK_DATABASE"]:
+        quiz_decks = SQLiteDeckStore(
+            app.config["QUIZ_DECK_DATABASE"], app.config["QUIZ_SESSIONS"]
+        )
+    else:
+        quiz_decks = MemoryDeckStore(app.config["QUIZ_SESSIONS"])
 
     @app.after_request
     def after_request(response):
@@ -73,70 +193,90 @@ def create_app(test_config=None):
         )
 
     @app.route("/categories")
+    @conditional(lambda: [(Category,)])
     def get_categories():
         try:
-            categories = Category.query.all()
-            formatted_categories = format_categories(categories)
-            if len(categories) == 0:
+            categories = category_cache.get()
+            if len(categories.types) == 0:
                 abort(404)
 
-            return jsonify({"success": True, "categories": formatted_categories})
+            return json_response({"success": True}, categories=categories.mapping)
         except:
             abort(400)
 
-    @app.route("/categories/<category_id>/questions")
+    @app.route("/categories/<int:category_id>/questions")
+    @conditional(
+        lambda category_id: [(Question, Question.category == category_id), (Category,)]
+    )
     def get_category_questions(category_id):
-        category = Category.query.get(category_id)
+        categories = category_cache.get()
+        current_category = categories.fragments.get(category_id)
 
-        if not category:
+        if not current_category:
             abort(404)
 
-        current_category = category.format()
-
-        categories = Category.query.all()
-        formatted_categories = format_categories(categories)
-
-        questions = Question.query.filter_by(category=category_id).all()
-        formatted_questions = paginate_questions(request, questions)
+        # the version stamp already counted the category's questions
+        formatted_questions, total_questions = paginate_questions(
+            request, Question.query.filter_by(category=category_id), g.version[1]
+        )
 
-        if len(questions) == 0:
+        if total_questions == 0:
             abort(404)
 
-        return jsonify(
+        return json_response(
             {
                 "success": True,
                 "questions": formatted_questions,
-                "totalQuestions": len(questions),
-                "categories": formatted_categories,
-                "currentCategory": current_category,
-            }
+                "totalQuestions": total_questions,
+            },
+            categories=categories.mapping,
+            currentCategory=current_category,
         )
 
+    @app.route("/categories/stats")
+    @conditional(lambda: [(Question,), (Category,)])
+    def get_category_stats():
+        """Counts the questions of each category, in total and per
+        difficulty, with one GROUP BY over the (category, difficulty) index."""
+        counts = (
+            db.session.query(
+                Question.category, Question.difficulty, func.count(Question.id)
+            )
+            .group_by(Question.category, Question.difficulty)
+            .all()
+        )
+        stats = {
+            id: {"type": type, "totalQuestions": 0, "difficulties": {}}
+            for id, type in category_cache.get().types.items()
+        }
+        for category_id, difficulty, count in counts:
+            if category_id in stats:
+                stats[category_id]["totalQuestions"] += count
+                if difficulty is not None:
+                    stats[category_id]["difficulties"][difficulty] = count
+        return jsonify({"success": True, "categories": stats})
+
     @app.route("/questions")
+    @conditional(lambda: [(Question,), (Category,)])
     def get_question():
-        questions = Question.query.all()
-
-        # catches no questions in db
-        if len(questions) == 0:
-            abort(404)
-
-        formatted_questions = paginate_questions(request, questions)
+        # the version stamp already counted the questions
+        formatted_questions, total_questions = paginate_questions(
+            request, Question.query, g.version[1]
+        )
 
-        # catches invalid pages
+        # catches no questions in db and invalid pages
         if len(formatted_questions) == 0:
             abort(404)
 
-        categories = Category.query.all()
-        current_category = Category.query.get(1).format()
-        formatted_categories = format_categories(categories)
-        return jsonify(
+        categories = category_cache.get()
+        return json_response(
             {
                 "success": True,
                 "questions": formatted_questions,
-                "totalQuestions": len(questions),
-                "categories": formatted_categories,
-                "currentCategory": current_category,
-            }
+                "totalQuestions": total_questions,
+            },
+            categories=categories.mapping,
+            currentCategory=categories.fragments[1],
         )
 
     @app.route("/questions", methods=["POST"])
@@ -144,14 +284,20 @@ def create_app(test_config=None):
         data = json.loads(request.data)
         if "searchTerm" in data:
             search_term = data["searchTerm"]
-            try:
-                query = Question.question.ilike(f"%{search_term}%")
-                questions = Question.query.filter(query).all()
-
-                questions = [q.format() for q in questions]
-                return jsonify({"success": True, "questions": questions})
-            except:
+            page = data.get("page", 1)
+            if not isinstance(search_term, str) or not isinstance(page, int):
                 abort(400)
+
+            questions, total_questions = search_questions(
+                search_term.strip(), page, QUESTIONS_PER_PAGE
+            )
+            return jsonify(
+                {
+                    "success": True,
+                    "questions": questions,
+                    "totalQuestions": total_questions,
+                }
+            )
         else:
             if any(value is None for value in data.values()):
                 abort(422)
@@ -162,6 +308,76 @@ def create_app(test_config=None):
                 abort(422)
             return jsonify({"success": True})
 
+    @app.route("/questions/batch", methods=["POST"])
+    def post_questions_batch():
+        """Creates every question of the payload's questions array in one
+        transaction, or none of them if any is invalid."""
+        data = json.loads(request.data)
+        questions = data.get("questions") if isinstance(data, dict) else None
+        if not isinstance(questions, list) or not questions:
+            abort(400)
+
+        category_ids = {str(id) for id in category_cache.get().types}
+        errors = [validate_question(q, category_ids) for q in questions]
+        if any(errors):
+            results = [
+                {"index": index, "error": error} if error else {"index": index}
+                for index, error in enumerate(errors)
+            ]
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": 422,
+                        "message": "Unprocessable entity",
+                        "results": results,
+                    }
+                ),
+                422,
+            )
+
+        rows = [dict(q, category=int(q["category"])) for q in questions]
+        try:
+            ids = insert_questions(rows)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return jsonify(
+            {
+                "success": True,
+                "created": len(ids),
+                "results": [{"index": i, "id": id} for i, id in enumerate(ids)],
+            }
+        )
+
+    @app.route("/questions/batch", methods=["DELETE"])
+    def delete_questions_batch():
+        """Deletes the questions of the payload's ids array in one transaction
+        and reports which of them existed."""
+        data = json.loads(request.data)
+        ids = data.get("ids") if isinstance(data, dict) else None
+        if (
+            not isinstance(ids, list)
+            or not ids
+            or not all(isinstance(id, int) and not isinstance(id, bool) for id in ids)
+        ):
+            abort(400)
+
+        try:
+            found = delete_questions(ids)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return jsonify(
+            {
+                "success": True,
+                "deleted": len(found),
+                "results": [{"id": id, "deleted": id in found} for id in ids],
+            }
+        )
+
     @app.route("/questions/<id>", methods=["DELETE"])
     def delete_question(id):
         question = Question.query.get(id)
@@ -175,22 +391,53 @@ def create_app(test_config=None):
 
     @app.route("/quizzes", methods=["POST"])
     def create_quiz():
+        """Deals the next question of a quiz. The first call shuffles a deck
+        of the category's question ids, minus previous_questions, and
+        returns its quiz_session; later calls send quiz_session back along
+        with the questions asked so far, which deal a new deck when the
+        session has expired."""
         data = json.loads(request.data)
-        previous_questions = data["previous_questions"]
-        category_id = data["quiz_category"]["id"]
-        if category_id == 0:
-            questions = Question.query.all()
-        else:
-            questions = Question.query.filter(Question.category == category_id).all()
-        questions = [
-            question.format()
-            for question in questions
-            if question.id not in previous_questions
-        ]
+
+        def deal():
+            try:
+                category_id = int(data["quiz_category"]["id"])
+                previous_questions = set(data.get("previous_questions", []))
+            except (KeyError, TypeError, ValueError):
+                abort(422)
+            query = db.session.query(Question.id)
+            if category_id != 0:
+                query = query.filter(Question.category == category_id)
+            return quiz_decks.create(
+                id for id, in query if id not in previous_questions
+            )
+
+        session_id = data.get("quiz_session")
+        deal_again = "quiz_category" in data
+        if session_id is None:
+            session_id = deal()
+            deal_again = False
+
+        question = None
+        while question is None:
+            try:
+                question_id = quiz_decks.pop(session_id)
+            except KeyError:
+                # expired or evicted, so start over from what the client has seen
+                if not deal_again:
+                    abort(404)
+                session_id = deal()
+                deal_again = False
+                continue
+            if question_id is None:
+                break
+            # None when the question was deleted after the deck was dealt
+            question = Question.query.get(question_id)
+
         return jsonify(
             {
                 "success": True,
-                "question": random.choice(questions) if questions else False,
+                "question": question.format() if question else False,
+                "quiz_session": session_id,
             }
         )
 
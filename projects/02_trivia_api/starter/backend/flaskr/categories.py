@@ -0,0 +1,60 @@
+import json
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, Category
+
+# types maps id -> type, fragments maps id -> the JSON of category.format()
+# and mapping is the JSON of the whole {id: type} map, as the responses use it.
+Categories = namedtuple("Categories", ["version", "types", "fragments", "mapping"])
+
+
+def encode(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class CategoryCache:
+    """The formatted categories, loaded once per process.
+
+    Every lookup reads the categories' version stamp, their latest updated_at
+    and their count, which changes whenever a category is written, and
+    reloads only when it differs from the one loaded."""
+
+    def __init__(self):
+        self.snapshot = Categories(None, {}, {}, encode({}))
+
+    def get(self):
+        version = tuple(
+            db.session.query(
+                func.max(Category.updated_at), func.count(Category.id)
+            ).one()
+        )
+        snapshot = self.snapshot
+        if version != snapshot.version:
+            snapshot = self.snapshot = self.load(version)
+        return snapshot
+
+    def load(self, version):
+        categories = [c.format() for c in Category.query.order_by(Category.id)]
+        types = {c["id"]: c["type"] for c in categories}
+        return Categories(
+            version,
+            types,
+            {c["id"]: encode(c) for c in categories},
+            encode(types),
+        )
+
+
+def json_response(payload, status=200, **fragments):
+    """Like jsonify, but adds the already encoded JSON fragments as extra
+    keys of the payload instead of serializing them again."""
+    parts = [encode(payload)[:-1]]
+    for key, fragment in fragments.items():
+        parts += [b"," if payload or len(parts) > 1 else b"", encode(key), b":"]
+        parts.append(fragment)
+    parts.append(b"}")
+    return current_app.response_class(
+        b"".join(parts), status=status, mimetype="application/json"
+    )
@@ -0,0 +1,101 @@
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def shuffled(question_ids):
+    deck = list(question_ids)
+    random.shuffle(deck)
+    return deck
+
+
+class MemoryDeckStore:
+    """Quiz decks kept in this process, dropping the least recently used
+    session once there are more than max_sessions. Only works with a single
+    worker process."""
+
+    def __init__(self, max_sessions=1000):
+        self.max_sessions = max_sessions
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, question_ids):
+        session_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._decks[session_id] = shuffled(question_ids)
+            while len(self._decks) > self.max_sessions:
+                self._decks.popitem(last=False)
+        return session_id
+
+    def pop(self, session_id):
+        """Returns the next question id of the deck, None once it is empty,
+        and raises KeyError for unknown or expired sessions."""
+        with self._lock:
+            deck = self._decks[session_id]
+            self._decks.move_to_end(session_id)
+            return deck.pop() if deck else None
+
+
+class SQLiteDeckStore:
+    """Quiz decks in a SQLite file that all worker processes share, as
+    comma separated ids with the next question last."""
+
+    def __init__(self, path, max_sessions=1000):
+        self.path = path
+        self.max_sessions = max_sessions
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_decks "
+                "(session_id TEXT PRIMARY KEY, deck TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_quiz_decks_used ON quiz_decks (used)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def create(self, question_ids):
+        session_id = secrets.token_urlsafe(16)
+        deck = ",".join(str(id) for id in shuffled(question_ids))
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT INTO quiz_decks VALUES (?, ?, ?)",
+                (session_id, deck, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM quiz_decks WHERE session_id IN (SELECT session_id "
+                "FROM quiz_decks ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        return session_id
+
+    def pop(self, session_id):
+        """Returns the next question id of the deck, None once it is empty,
+        and raises KeyError for unknown or expired sessions."""
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT deck FROM quiz_decks WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                connection.execute("ROLLBACK")
+                raise KeyError(session_id)
+            rest, _, last = row[0].rpartition(",")
+            connection.execute(
+                "UPDATE quiz_decks SET deck = ?, used = ? WHERE session_id = ?",
+                (rest, time.time(), session_id),
+            )
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        return int(last) if last else None
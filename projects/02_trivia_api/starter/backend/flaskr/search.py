@@ -0,0 +1,49 @@
+from sqlalchemy import column, func, literal_column, or_, table, text
+
+from models import db, Question
+
+# Written with literals rather than bound parameters so that the queries
+# repeat the exact expression of the search indexes in models.py.
+DOCUMENT = (
+    func.coalesce(Question.question, literal_column("''"))
+    + literal_column("' '")
+    + func.coalesce(Question.answer, literal_column("''"))
+)
+VECTOR = func.to_tsvector(literal_column("'english'::regconfig"), DOCUMENT)
+TRIGRAM = 3
+
+questions_fts = table("questions_fts", column("rowid"))
+
+
+def contains(term):
+    escaped = term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return DOCUMENT.ilike(f"%{escaped}%", escape="!")
+
+
+def search_questions(term, page=1, per_page=10):
+    """Returns one page of the questions whose question or answer contains
+    term, best match first, and the number of matches."""
+    dialect = db.engine.dialect.name
+    query = Question.query
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery(
+            literal_column("'english'::regconfig"), term
+        )
+        query = query.filter(or_(VECTOR.op("@@")(tsquery), contains(term)))
+        order = [func.ts_rank_cd(VECTOR, tsquery).desc()]
+    elif dialect == "sqlite" and len(term) >= TRIGRAM:
+        match = '"' + term.replace('"', '""') + '"'
+        query = query.join(questions_fts, questions_fts.c.rowid == Question.id)
+        query = query.filter(text("questions_fts MATCH :match")).params(match=match)
+        order = [text("bm25(questions_fts)")]
+    else:
+        query = query.filter(contains(term))
+        order = []
+
+    total = query.count()
+    questions = (
+        query.order_by(*order, Question.id)
+        .offset((max(page, 1) - 1) * per_page)
+        .limit(per_page)
+    )
+    return [q.format() for q in questions], total
@@ -1,5 +1,17 @@
 import os
-from sqlalchemy import Column, String, Integer
+from datetime import datetime
+
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Integer,
+    event,
+    func,
+)
 from flask_sqlalchemy import SQLAlchemy
 
 database_name = "trivia"
@@ -19,12 +31,30 @@ def setup_db(app, database_path=database_path):
 
 class Question(db.Model):
     __tablename__ = "questions"
+    # also serves the category filters on its own, as the leading column
+    __table_args__ = (
+        Index("ix_questions_category_difficulty", "category", "difficulty"),
+        # max(updated_at) in the version stamp of every conditional response
+        Index("ix_questions_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     question = Column(String)
     answer = Column(String)
-    category = Column(String)
+    category = Column(
+        Integer,
+        ForeignKey(
+            "categories.id", name="category", onupdate="CASCADE", ondelete="SET NULL"
+        ),
+    )
     difficulty = Column(Integer)
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=func.now(),
+    )
 
     def __init__(self, question, answer, category, difficulty):
         self.question = question
@@ -53,11 +83,58 @@ class Question(db.Model):
         }
 
 
+# The search indexes of flaskr/search.py, created along with the questions
+# table. trivia.psql creates the Postgres ones for a restored database.
+SEARCH_DOCUMENT = "coalesce(question, '') || ' ' || coalesce(answer, '')"
+SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        # ranked word matches
+        "CREATE INDEX ix_questions_search ON questions USING gin "
+        f"(to_tsvector('english'::regconfig, {SEARCH_DOCUMENT}))",
+        # substring matches, which ILIKE can then answer without a scan
+        "CREATE INDEX ix_questions_search_trgm ON questions USING gin "
+        f"(({SEARCH_DOCUMENT}) gin_trgm_ops)",
+    ],
+    # SQLite mirrors questions into an FTS5 table kept in sync by triggers.
+    # The trigram tokenizer matches substrings, like ILIKE, and bm25 ranks them.
+    "sqlite": [
+        "CREATE VIRTUAL TABLE questions_fts USING fts5(question, answer, "
+        "content='questions', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER questions_fts_insert AFTER INSERT ON questions "
+        "BEGIN INSERT INTO questions_fts(rowid, question, answer) "
+        "VALUES (new.id, new.question, new.answer); END",
+        "CREATE TRIGGER questions_fts_delete AFTER DELETE ON questions "
+        "BEGIN INSERT INTO questions_fts(questions_fts, rowid, question, answer) "
+        "VALUES ('delete', old.id, old.question, old.answer); END",
+        "CREATE TRIGGER questions_fts_update AFTER UPDATE ON questions "
+        "BEGIN INSERT INTO questions_fts(questions_fts, rowid, question, answer) "
+        "VALUES ('delete', old.id, old.question, old.answer); "
+        "INSERT INTO questions_fts(rowid, question, answer) "
+        "VALUES (new.id, new.question, new.answer); END",
+    ],
+}
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Question.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
+
+
 class Category(db.Model):
     __tablename__ = "categories"
 
     id = Column(Integer, primary_key=True)
     type = Column(String)
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=func.now(),
+    )
 
     def __init__(self, type):
         self.type = type
@@ -1,10 +1,12 @@
 import os
+import shutil
+import tempfile
 import unittest
 import json
 from flask_sqlalchemy import SQLAlchemy
 
 from flaskr import create_app
-from models import setup_db, Question, Category
+from models import db, setup_db, Question, Category
 
 import logging
 
@@ -50,6 +52,23 @@ class TriviaTestCase(unittest.TestCase):
             },
         )
 
+    def test_get_categories_reloads_after_category_written(self):
+        res = self.client().get("/categories")
+        self.assertEqual(len(json.loads(res.data)["categories"]), 6)
+
+        category = Category("Music")
+        db.session.add(category)
+        db.session.commit()
+        res = self.client().get("/categories")
+        categories = json.loads(res.data)["categories"]
+        self.assertEqual(categories[str(category.id)], "Music")
+
+        # delete the category we just created to keep database the same
+        db.session.delete(category)
+        db.session.commit()
+        res = self.client().get("/categories")
+        self.assertNotIn(str(category.id), json.loads(res.data)["categories"])
+
     def test_get_questions_first_page(self):
         res = self.client().get("/questions")
         response = json.loads(res.data)
@@ -72,6 +91,50 @@ class TriviaTestCase(unittest.TestCase):
             response, {"error": 404, "message": "Not found", "success": False}
         )
 
+    def test_get_questions_after_cursor(self):
+        res = self.client().get("/questions")
+        first_page = json.loads(res.data)["questions"]
+        last_id = first_page[-1]["id"]
+
+        res = self.client().get(f"/questions?after={last_id}")
+        response = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(response["questions"]), 9)
+        self.assertTrue(all(q["id"] > last_id for q in response["questions"]))
+        self.assertEqual(response["totalQuestions"], 19)
+
+        res = self.client().get("/questions?page=2")
+        self.assertEqual(json.loads(res.data)["questions"], response["questions"])
+
+    def test_get_questions_not_modified(self):
+        res = self.client().get("/questions")
+        etag = res.headers["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        # max(updated_at) stays the same when a question is deleted
+        self.assertIsNone(res.headers.get("Last-Modified"))
+
+        res = self.client().get("/questions", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b"")
+
+        res = self.client().get("/categories", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_get_questions_etag_changes_after_create(self):
+        res = self.client().get("/categories/1/questions")
+        etag = res.headers["ETag"]
+
+        question = Question("random", "random", "1", 1)
+        question.insert()
+        res = self.client().get(
+            "/categories/1/questions", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers["ETag"], etag)
+
+        # delete the question we just created to keep database the same
+        question.delete()
+
     def test_delete_question(self):
         """ create question with SQL alchemy and delete with api"""
         data = {
@@ -139,6 +202,51 @@ class TriviaTestCase(unittest.TestCase):
             {"success": False, "error": 422, "message": "Unprocessable entity"},
         )
 
+    def test_batch_create_and_delete_questions(self):
+        questions_count = len(Question.query.all())
+        data = {
+            "questions": [
+                {"question": "batch 1", "answer": "a", "category": 1, "difficulty": 1},
+                {
+                    "question": "batch 2",
+                    "answer": "b",
+                    "category": "2",
+                    "difficulty": 2,
+                },
+            ]
+        }
+        res = self.client().post("/questions/batch", json=data)
+        response = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(response["created"], 2)
+        ids = [result["id"] for result in response["results"]]
+        self.assertEqual(Question.query.get(ids[1]).question, "batch 2")
+
+        res = self.client().delete("/questions/batch", json={"ids": ids + [1000001]})
+        response = json.loads(res.data)
+        self.assertEqual(response["deleted"], 2)
+        self.assertEqual(
+            [result["deleted"] for result in response["results"]], [True, True, False]
+        )
+        self.assertEqual(len(Question.query.all()), questions_count)
+
+    def test_batch_create_rejects_invalid_rows(self):
+        questions_count = len(Question.query.all())
+        data = {
+            "questions": [
+                {"question": "batch 1", "answer": "a", "category": 1, "difficulty": 1},
+                {"question": "batch 2", "answer": "b", "category": 1},
+            ]
+        }
+        res = self.client().post("/questions/batch", json=data)
+        response = json.loads(res.data)
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(
+            response["results"],
+            [{"index": 0}, {"index": 1, "error": "missing difficulty"}],
+        )
+        self.assertEqual(len(Question.query.all()), questions_count)
+
     def test_question_search(self):
         data = {"searchTerm": "title"}
         res = self.client().post("/questions", json=data)
@@ -146,8 +254,24 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response["success"], True)
         questions = response["questions"]
         self.assertEqual(len(questions), 2)
-        self.assertEqual(questions[0]["id"], 5)
-        self.assertEqual(questions[1]["id"], 6)
+        self.assertEqual(response["totalQuestions"], 2)
+        # the whole word "title" ranks above the "entitled" of question 5
+        self.assertEqual(questions[0]["id"], 6)
+        self.assertEqual(questions[1]["id"], 5)
+
+    def test_question_search_matches_answers(self):
+        data = {"searchTerm": "maya angelou"}
+        res = self.client().post("/questions", json=data)
+        response = json.loads(res.data)
+        self.assertEqual(response["totalQuestions"], 1)
+        self.assertEqual(response["questions"][0]["id"], 5)
+
+    def test_question_search_past_last_page(self):
+        data = {"searchTerm": "title", "page": 2}
+        res = self.client().post("/questions", json=data)
+        response = json.loads(res.data)
+        self.assertEqual(response["questions"], [])
+        self.assertEqual(response["totalQuestions"], 2)
 
     def test_get_category_questions(self):
         res = self.client().get("/categories/1/questions")
@@ -155,6 +279,17 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(response["currentCategory"], {"id": 1, "type": "Science"})
         self.assertEqual(len(response["questions"]), 3)
 
+    def test_get_category_stats(self):
+        res = self.client().get("/categories/stats")
+        response = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        categories = response["categories"]
+        self.assertEqual(len(categories), 6)
+        self.assertEqual(categories["1"]["type"], "Science")
+        self.assertEqual(categories["1"]["totalQuestions"], 3)
+        self.assertEqual(sum(categories["1"]["difficulties"].values()), 3)
+        self.assertEqual(sum(c["totalQuestions"] for c in categories.values()), 19)
+
     def test_get_questions_by_category_returns_error_for_bad_category(self):
         res = self.client().get("/categories/100000/questions")
         response = json.loads(res.data)
@@ -171,6 +306,121 @@ class TriviaTestCase(unittest.TestCase):
         # assert previous doesn't reapper
         self.assertTrue(response["question"]["id"] != 1)
 
+    def test_quiz_session_deals_each_question_once(self):
+        data = {"previous_questions": [], "quiz_category": {"id": 1}}
+        res = self.client().post("/quizzes", json=data)
+        response = json.loads(res.data)
+        session = response["quiz_session"]
+
+        asked = []
+        while response["question"]:
+            self.assertEqual(response["quiz_session"], session)
+            asked.append(response["question"]["id"])
+            res = self.client().post("/quizzes", json={"quiz_session": session})
+            response = json.loads(res.data)
+        self.assertEqual(len(asked), 3)
+        self.assertEqual(len(set(asked)), 3)
+
+    def test_quiz_session_unknown_returns_404(self):
+        res = self.client().post("/quizzes", json={"quiz_session": "unknown"})
+        response = json.loads(res.data)
+        self.assertEqual(
+            response, {"error": 404, "message": "Not found", "success": False}
+        )
+
+    def test_quiz_session_expired_deals_again(self):
+        data = {"previous_questions": [], "quiz_category": {"id": 1}}
+        res = self.client().post("/quizzes", json=data)
+        response = json.loads(res.data)
+        first = response["question"]["id"]
+
+        data = {
+            "quiz_session": "expired",
+            "previous_questions": [first],
+            "quiz_category": {"id": 1},
+        }
+        res = self.client().post("/quizzes", json=data)
+        response = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(response["quiz_session"], "expired")
+        self.assertEqual(response["question"]["category"], 1)
+        self.assertNotEqual(response["question"]["id"], first)
+
+    def test_create_quiz_without_category_id_returns_422(self):
+        data = {"previous_questions": [], "quiz_category": {"type": "Science"}}
+        res = self.client().post("/quizzes", json=data)
+        response = json.loads(res.data)
+        self.assertEqual(
+            response,
+            {"success": False, "error": 422, "message": "Unprocessable entity"},
+        )
+
+
+class SQLiteSearchTestCase(unittest.TestCase):
+    """Search on SQLite, which uses an FTS5 table in place of the Postgres
+    indexes"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app(
+            {"DATABASE_PATH": f"sqlite:///{self.directory}/trivia.db"}
+        )
+        self.client = self.app.test_client
+        questions = [
+            (
+                "Whose autobiography is entitled 'I Know Why the Caged Bird Sings'?",
+                "Maya Angelou",
+            ),
+            ("What boxer's original name is Cassius Clay?", "Muhammad Ali"),
+            (
+                "What movie earned Tom Hanks his third straight Oscar "
+                "nomination, in 1996?",
+                "Apollo 13",
+            ),
+            (
+                "What was the title of the 1990 fantasy directed by Tim Burton?",
+                "Edward Scissorhands",
+            ),
+        ]
+        with self.app.app_context():
+            category = Category("Entertainment")
+            db.session.add(category)
+            db.session.commit()
+            self.ids = []
+            for question, answer in questions:
+                question = Question(question, answer, category.id, 1)
+                question.insert()
+                self.ids.append(question.id)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.get_engine(self.app).dispose()
+        shutil.rmtree(self.directory)
+
+    def search(self, term):
+        res = self.client().post("/questions", json={"searchTerm": term})
+        response = json.loads(res.data)
+        ids = [question["id"] for question in response["questions"]]
+        return sorted(ids), response["totalQuestions"]
+
+    def test_search_matches_substrings(self):
+        self.assertEqual(self.search("title"), ([self.ids[0], self.ids[3]], 2))
+        self.assertEqual(self.search("ANGELOU"), ([self.ids[0]], 1))
+
+    def test_search_shorter_than_a_trigram(self):
+        self.assertEqual(self.search("13"), ([self.ids[2]], 1))
+
+    def test_search_follows_updates_and_deletes(self):
+        with self.app.app_context():
+            question = Question.query.get(self.ids[1])
+            question.answer = "Cassius Marcellus Clay"
+            question.update()
+            Question.query.get(self.ids[3]).delete()
+        self.assertEqual(self.search("marcellus"), ([self.ids[1]], 1))
+        self.assertEqual(self.search("muhammad"), ([], 0))
+        self.assertEqual(self.search("title"), ([self.ids[0]], 1))
+
 
 if __name__ == "__main__":
     unittest.main()